@@ -1,5 +1,20 @@
 import csv
-import pandas as pd
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to PYTHONPATH
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from src.glossex.metrics import load_gold, prf
+
+# console labels of the two default systems; other files print their stem
+LABELS = {"final_terms": "Model", "tfidf_baseline_top_terms": "Baseline (TF-IDF)"}
 
 
 def load_predictions(path):
@@ -8,12 +23,6 @@ def load_predictions(path):
         return [row["term"].strip().lower() for row in reader if row.get("term")]
 
 
-def load_gold(path):
-    df = pd.read_csv(path)
-    col = df.columns[0]
-    return set(df[col].astype(str).str.strip().str.lower())
-
-
 def evaluate_at_k(preds, gold, k):
     topk = preds[:k]
     correct = sum(1 for term in topk if term in gold)
@@ -25,26 +34,184 @@ def evaluate_at_k(preds, gold, k):
     return precision, recall, f1
 
 
-def main():
-    model_preds = load_predictions("demo/outputs/final_terms.csv")
-    baseline_preds = load_predictions("demo/outputs/tfidf_baseline_top_terms.csv")
-    gold = load_gold("data/gold_glossary.csv")
-
-    for k in [50, 100, 200]:
+def gold_hit_counts(preds, gold_index, ks):
+    """
+    (n_gold, len(ks)) matrix: how often each gold term occurs in the top k
+    of `preds`, for every k in the sorted `ks`. Built from one pass over
+    the list; its column sums are the hit counts of evaluate_at_k.
+    """
+    n_gold = len(gold_index)
+    max_k = int(ks[-1]) if len(ks) else 0
+    pos = np.array([gold_index.get(term, -1) for term in preds[:max_k]], dtype=np.int64)
+    rank = np.flatnonzero(pos >= 0)
+
+    # a hit at rank r counts for every k > r
+    diff = np.zeros((n_gold, len(ks) + 1))
+    np.add.at(diff, (pos[rank], np.searchsorted(ks, rank, side="right")), 1)
+    return np.cumsum(diff, axis=1)[:, :len(ks)]
+
+
+def _bootstrap_chunk(counts, ks, n_boot, seed):
+    """
+    P/R/F1 of every system on `n_boot` resamples of the gold glossary.
+    A resample draws n_gold terms with replacement, so gold term g appears
+    w_g times (w ~ Multinomial(n_gold, uniform)). Every hit on g counts
+    w_g times, both in the hits and in the number of predictions it stands
+    for, while non-gold predictions count once:
+
+        recall    = sum(w_g * hits_g) / n_gold
+        precision = sum(w_g * hits_g) / (k - hits + sum(w_g * hits_g))
+
+    With all w_g = 1 this is evaluate_at_k. The weighted hits of all
+    systems at all K are one (resamples x gold) @ (gold x systems*K)
+    product.
+    """
+    n_gold, n_systems, n_ks = counts.shape
+    rng = np.random.default_rng(seed)
+    weights = rng.multinomial(n_gold, np.full(n_gold, 1 / n_gold), size=n_boot).astype(float)
+
+    weighted = (weights @ counts.reshape(n_gold, -1)).reshape(n_boot, n_systems, n_ks)
+    predicted = ks - counts.sum(axis=0) + weighted
+    # prf divides the hits by its second argument for precision
+    values = prf(weighted, predicted, n_gold)
+    # (systems, 3 metrics, n_boot, len(ks))
+    return np.stack(values, axis=1).transpose(2, 1, 0, 3)
+
+
+def evaluate_systems(
+    systems,
+    gold,
+    ks=(50, 100, 200),
+    n_boot=1000,
+    confidence=0.95,
+    reference=None,
+    seed=0,
+    n_jobs=None,
+    chunk_size=250,
+):
+    """
+    Evaluate any number of ranked prediction lists ({name: terms}) against
+    the gold set.
+
+    Each system is matched against the gold list once; the cumulative hits
+    give precision/recall/F1 at every K in `ks` together (ks=None means
+    every K up to the longest list).
+
+    With `n_boot` > 0 the gold glossary is bootstrapped (see
+    _bootstrap_chunk) and every metric gets a percentile interval; with a `reference` system the paired
+    difference to it (same resamples) gets one too. The resamples are cut
+    into fixed chunks of `chunk_size`, each with its own child of
+    SeedSequence(seed), and spread over `n_jobs` processes, so the
+    intervals do not depend on n_jobs.
+    """
+    names = list(systems)
+    gold_list = sorted(gold)
+    gold_index = {term: i for i, term in enumerate(gold_list)}
+    n_gold = len(gold_list)
+
+    if ks is None:
+        ks = range(1, max((len(p) for p in systems.values()), default=0) + 1)
+    ks = np.array(sorted(set(int(k) for k in ks)), dtype=np.int64)
+
+    # (n_gold, systems, len(ks))
+    counts = np.zeros((n_gold, len(names), len(ks)))
+    for s, name in enumerate(names):
+        counts[:, s] = gold_hit_counts(systems[name], gold_index, ks)
+
+    results = {
+        "n_gold": n_gold,
+        "ks": ks.tolist(),
+        "n_boot": n_boot,
+        "confidence": confidence,
+        "reference": reference,
+        "systems": {},
+    }
+
+    metrics = ("precision", "recall", "f1")
+    for s, name in enumerate(names):
+        correct = counts[:, s].sum(axis=0)
+        values = prf(correct, ks, n_gold)
+        results["systems"][name] = {
+            "n_predictions": len(systems[name]),
+            "hits": correct.astype(int).tolist(),
+            **{m: v.tolist() for m, v in zip(metrics, values)},
+        }
+
+    if n_boot <= 0 or n_gold == 0:
+        return results
+
+    sizes = [min(chunk_size, n_boot - start) for start in range(0, n_boot, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(counts, ks, size, s) for size, s in zip(sizes, seeds)]
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(args))
+    if n_jobs == 1:
+        chunks = [_bootstrap_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, *zip(*args)))
+    boot = np.concatenate(chunks, axis=2)
+
+    tail = (1 - confidence) / 2 * 100
+
+    def interval(samples):
+        lo, hi = np.percentile(samples, [tail, 100 - tail], axis=0)
+        return {"low": lo.tolist(), "high": hi.tolist()}
+
+    ref = names.index(reference) if reference is not None else None
+    for s, name in enumerate(names):
+        entry = results["systems"][name]
+        entry["ci"] = {m: interval(boot[s, j]) for j, m in enumerate(metrics)}
+        if ref is not None and s != ref:
+            entry["delta_vs_reference"] = {
+                m: {
+                    "value": (
+                        np.array(entry[m]) - np.array(results["systems"][reference][m])
+                    ).tolist(),
+                    **interval(boot[s, j] - boot[ref, j]),
+                }
+                for j, m in enumerate(metrics)
+            }
+
+    return results
+
+
+def evaluate_files(pred_paths, gold_path, **kwargs):
+    """
+    evaluate_systems over prediction CSVs, each named by its file stem.
+    """
+    systems = {Path(p).stem: load_predictions(p) for p in pred_paths}
+    return evaluate_systems(systems, load_gold(gold_path), **kwargs)
+
+
+def main(
+    pred_paths=("demo/outputs/final_terms.csv", "demo/outputs/tfidf_baseline_top_terms.csv"),
+    ks=(50, 100, 200),
+    n_boot=1000,
+    out_path="results/evaluation.json",
+):
+    results = evaluate_files(
+        pred_paths,
+        "data/gold_glossary.csv",
+        ks=ks,
+        n_boot=n_boot,
+        reference=Path(pred_paths[-1]).stem,
+    )
+
+    for i, k in enumerate(results["ks"]):
         print(f"\n=== Evaluation @ {k} ===")
-
-        mp, mr, mf = evaluate_at_k(model_preds, gold, k)
-        bp, br, bf = evaluate_at_k(baseline_preds, gold, k)
-
-        print("\nModel:")
-        print(f"Precision: {mp:.3f}")
-        print(f"Recall:    {mr:.3f}")
-        print(f"F1-score:  {mf:.3f}")
-
-        print("\nBaseline (TF-IDF):")
-        print(f"Precision: {bp:.3f}")
-        print(f"Recall:    {br:.3f}")
-        print(f"F1-score:  {bf:.3f}")
+        for name, r in results["systems"].items():
+            print(f"\n{LABELS.get(name, name)}:")
+            for m, label in [("precision", "Precision"), ("recall", "Recall"), ("f1", "F1-score")]:
+                line = f"{label + ':':<11}{r[m][i]:.3f}"
+                if "ci" in r:
+                    line += f"  [{r['ci'][m]['low'][i]:.3f}, {r['ci'][m]['high'][i]:.3f}]"
+                print(line)
+
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print("\nSaved:", out_path)
 
 
 if __name__ == "__main__":
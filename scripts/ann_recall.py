@@ -0,0 +1,76 @@
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from src.glossex.ann_index import index_recall, load_or_build_index
+from src.glossex.embedding_store import load_embedding_store
+from src.glossex.rank_phrases import load_seed_list
+
+
+def main(
+    embeddings_path="data/processed/lemma_embeddings",
+    n_probes=(1, 2, 4, 8, 16, 32),
+    k=10,
+    n_queries=200,
+    random_state=0,
+):
+    prefix = str(project_root / embeddings_path)
+    embeddings = load_embedding_store(prefix)
+
+    start = time.perf_counter()
+    index = load_or_build_index(embeddings, f"{prefix}.ann.npz")
+    load_seconds = time.perf_counter() - start
+
+    # the seeds plus a random sample of the vocabulary
+    seeds = load_seed_list(str(project_root / "data" / "seeds" / "economics.txt"))
+    seeds += load_seed_list(str(project_root / "data" / "seeds" / "general.txt"))
+    queries = [s for s in dict.fromkeys(seeds) if s in index.index]
+    rng = random.Random(random_state)
+    queries += rng.sample(index.tokens, min(n_queries, len(index.tokens)))
+
+    results = []
+    for n_probe in n_probes:
+        if n_probe > len(index.centroids):
+            continue
+        start = time.perf_counter()
+        for term in queries:
+            index.search(index.full[index.index[term]], k, n_probe)
+        ms = (time.perf_counter() - start) / len(queries) * 1000
+        results.append({
+            "n_probe": n_probe,
+            f"recall@{k}": index_recall(index, queries, k, n_probe),
+            "ms_per_query": round(ms, 4),
+        })
+
+    out_path = project_root / "results" / "ann_recall.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "vocab_size": len(index),
+                "n_lists": len(index.centroids),
+                "scan_dim": index.vectors.shape[1],
+                "build_or_load_seconds": round(load_seconds, 3),
+                "n_queries": len(queries),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    print(f"{len(index)} tokens, {len(index.centroids)} lists, {len(queries)} queries")
+    for r in results:
+        print(
+            f"n_probe={r['n_probe']:>3}  recall@{k}={r[f'recall@{k}']:.3f}  "
+            f"{r['ms_per_query']:.3f} ms/query"
+        )
+    print("Saved:", out_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
+
+from src.glossex.clustering import CLUSTER_METHODS, cluster_embeddings
+from src.glossex.embedding_store import load_embedding_store
+from src.glossex.filtering import filter_clusters, load_seed_list
+
+
+def labels_of(clusters, tokens):
+    label = {t: cid for cid, members in clusters.items() for t in members}
+    return [label[t] for t in tokens]
+
+
+def selected_terms(clusters, embeddings, econ_seeds, general_seeds):
+    filtered = filter_clusters(clusters, embeddings, econ_seeds, general_seeds)
+    return {t for members in filtered.values() for t in members}
+
+
+def main():
+    embeddings = load_embedding_store(str(project_root / "data" / "processed" / "lemma_embeddings"))
+    econ_seeds = load_seed_list(str(project_root / "data" / "seeds" / "economics.txt"))
+    general_seeds = load_seed_list(str(project_root / "data" / "seeds" / "general.txt"))
+
+    tokens = list(embeddings.keys())
+    n_clusters = max(2, len(tokens) // 4)
+
+    results = {}
+    reference = None
+    for method in CLUSTER_METHODS:
+        start = time.perf_counter()
+        clusters = cluster_embeddings(embeddings, n_clusters, method=method)
+        elapsed = time.perf_counter() - start
+
+        labels = labels_of(clusters, tokens)
+        terms = selected_terms(clusters, embeddings, econ_seeds, general_seeds)
+        if reference is None:
+            reference = (labels, terms)
+
+        results[method] = {
+            "seconds": round(elapsed, 3),
+            "ari_vs_agglomerative": adjusted_rand_score(reference[0], labels),
+            "nmi_vs_agglomerative": normalized_mutual_info_score(reference[0], labels),
+            "selected_terms": len(terms),
+            "selected_overlap_vs_agglomerative": (
+                len(terms & reference[1]) / max(1, len(terms | reference[1]))
+            ),
+        }
+
+    out_path = project_root / "results" / "clustering_comparison.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"vocab_size": len(tokens), "n_clusters": n_clusters, "methods": results}, f, indent=2)
+
+    print(f"{len(tokens)} tokens, {n_clusters} clusters")
+    for method, r in results.items():
+        print(
+            f"{method:<18} {r['seconds']:>8.2f}s  ARI={r['ari_vs_agglomerative']:.3f}  "
+            f"NMI={r['nmi_vs_agglomerative']:.3f}  "
+            f"selected={r['selected_terms']} (Jaccard {r['selected_overlap_vs_agglomerative']:.3f})"
+        )
+    print("Saved:", out_path)
+
+
+if __name__ == "__main__":
+    main()
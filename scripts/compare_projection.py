@@ -0,0 +1,112 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy.stats import spearmanr
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from evaluation.eval_topk import evaluate_at_k, load_gold
+from src.glossex.clustering import cluster_embeddings
+from src.glossex.embedding_store import load_embedding_store
+from src.glossex.filtering import filter_clusters
+from src.glossex.hybrid_rank import hybrid_rank, tfidf_score_map
+from src.glossex.ngram_stats import load_or_fit_ngram_tfidf
+from src.glossex.projection import PROJECTION_METHODS, fit_projection, reduce_embeddings
+from src.glossex.rank_phrases import load_seed_list, rank_phrases
+
+
+def run(embeddings, dtype, phrases, econ_seeds, general_seeds, tfidf_map, n_clusters):
+    ranked = rank_phrases(phrases, embeddings, econ_seeds, general_seeds, dtype=dtype)
+    clusters = cluster_embeddings(embeddings, n_clusters)
+    filtered = filter_clusters(clusters, embeddings, econ_seeds, general_seeds, dtype=dtype)
+    return {
+        "phrase_scores": {r["term"]: r["score"] for r in ranked},
+        "final_terms": [r["term"] for r in hybrid_rank(ranked, tfidf_map)],
+        "selected": {t for members in filtered.values() for t in members},
+    }
+
+
+def main(n_components=(32, 64, 128, 256), dtypes=("float32", "float16"), top_k=100):
+    processed = project_root / "data" / "processed"
+    embeddings = load_embedding_store(str(processed / "lemma_embeddings"))
+    econ_seeds = load_seed_list(str(project_root / "data" / "seeds" / "economics.txt"))
+    general_seeds = load_seed_list(str(project_root / "data" / "seeds" / "general.txt"))
+    with open(processed / "phrase_candidates.json", "r", encoding="utf-8") as f:
+        phrases = json.load(f)
+    gold = load_gold(str(project_root / "data" / "gold_glossary.csv"))
+    terms, scores = load_or_fit_ngram_tfidf(
+        str(project_root / "data" / "raw" / "economics_sample.txt"),
+        str(processed / "ngram_tfidf.npz"),
+    )
+    tfidf_map = tfidf_score_map(terms, scores)
+
+    dim = embeddings.vectors.shape[1]
+    n_clusters = max(2, len(embeddings) // 4)
+    args = (phrases, econ_seeds, general_seeds, tfidf_map, n_clusters)
+
+    full = run(embeddings, np.float64, *args)
+    full_terms = list(full["phrase_scores"])
+    full_top = set(full_terms[:top_k])
+
+    results = []
+    for method in PROJECTION_METHODS:
+        for k in sorted({min(k, dim) for k in n_components}):
+            components = fit_projection(embeddings.vectors, k, method)
+            for dtype in dtypes:
+                reduced = reduce_embeddings(embeddings, components, dtype)
+                compute = np.float32 if dtype == "float16" else dtype
+                out = run(reduced, compute, *args)
+
+                common = [t for t in full_terms if t in out["phrase_scores"]]
+                rho = spearmanr(
+                    [full["phrase_scores"][t] for t in common],
+                    [out["phrase_scores"][t] for t in common],
+                ).statistic
+                union = full["selected"] | out["selected"]
+                results.append({
+                    "method": method,
+                    "n_components": k,
+                    "dtype": dtype,
+                    "store_mb": round(reduced.vectors.nbytes / 2**20, 3),
+                    "phrase_spearman": float(rho),
+                    f"phrase_top{top_k}_overlap": len(full_top & set(list(out["phrase_scores"])[:top_k]))
+                    / max(1, len(full_top)),
+                    "selected_jaccard": len(full["selected"] & out["selected"]) / max(1, len(union)),
+                    "precision_at_k_delta": {
+                        str(kk): evaluate_at_k(out["final_terms"], gold, kk)[0]
+                        - evaluate_at_k(full["final_terms"], gold, kk)[0]
+                        for kk in [50, 100, 200]
+                    },
+                })
+
+    out_path = project_root / "results" / "projection_comparison.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "vocab_size": len(embeddings),
+                "dim": dim,
+                "full_store_mb": round(embeddings.vectors.nbytes / 2**20, 3),
+                "reduced": results,
+            },
+            f,
+            indent=2,
+        )
+
+    print(f"{len(embeddings)} tokens, {dim}-d full vectors")
+    for r in results:
+        deltas = " ".join(f"P@{k}{d:+.3f}" for k, d in r["precision_at_k_delta"].items())
+        print(
+            f"{r['method']:<6} {r['n_components']:>4}-d {r['dtype']:<7} {r['store_mb']:>8.3f} MB  "
+            f"spearman={r['phrase_spearman']:.3f}  "
+            f"top{top_k}={r[f'phrase_top{top_k}_overlap']:.2f}  "
+            f"selected J={r['selected_jaccard']:.3f}  {deltas}"
+        )
+    print("Saved:", out_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from evaluation.eval_topk import evaluate_at_k, load_gold
+from src.glossex.embedding_store import EmbeddingStore
+from src.glossex.embeddings import embed_tokens
+from src.glossex.hybrid_rank import hybrid_rank, tfidf_score_map
+from src.glossex.ngram_stats import load_or_fit_ngram_tfidf
+from src.glossex.rank_phrases import load_seed_list, rank_phrases
+from src.glossex.token_store import load_token_ids
+
+
+def store_of(embeddings):
+    tokens = sorted(embeddings)
+    return EmbeddingStore(tokens, np.array([embeddings[t] for t in tokens], dtype=np.float32))
+
+
+def final_terms(embeddings, phrases, econ_seeds, general_seeds, tfidf_map):
+    ranked = rank_phrases(phrases, embeddings, econ_seeds, general_seeds)
+    return [r["term"] for r in hybrid_rank(ranked, tfidf_map)]
+
+
+def main(model_name="distilbert-base-uncased", local_files_only=False, batch_size=64):
+    processed = project_root / "data" / "processed"
+    _, vocab = load_token_ids(str(processed / "processed_tokens"))
+    econ_seeds = load_seed_list(str(project_root / "data" / "seeds" / "economics.txt"))
+    general_seeds = load_seed_list(str(project_root / "data" / "seeds" / "general.txt"))
+    vocab = sorted(set(vocab) | set(econ_seeds) | set(general_seeds))
+
+    with open(processed / "phrase_candidates.json", "r", encoding="utf-8") as f:
+        phrases = json.load(f)
+    gold = load_gold(str(project_root / "data" / "gold_glossary.csv"))
+    terms, scores = load_or_fit_ngram_tfidf(
+        str(project_root / "data" / "raw" / "economics_sample.txt"),
+        str(processed / "ngram_tfidf.npz"),
+    )
+    tfidf_map = tfidf_score_map(terms, scores)
+
+    stores, seconds = {}, {}
+    for mode, quantize in [("fp32", False), ("int8", True)]:
+        # untimed warm-up (first load, thread pools)
+        embed_tokens(vocab[:batch_size], model_name, batch_size, quantize, local_files_only)
+
+        start = time.perf_counter()
+        embeddings = embed_tokens(vocab, model_name, batch_size, quantize, local_files_only)
+        seconds[mode] = time.perf_counter() - start
+        stores[mode] = store_of(embeddings)
+
+    a, b = stores["fp32"].vectors, stores["int8"].vectors
+    cos = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-9)
+
+    preds = {
+        mode: final_terms(store, phrases, econ_seeds, general_seeds, tfidf_map)
+        for mode, store in stores.items()
+    }
+    precision = {
+        k: {mode: evaluate_at_k(p, gold, k)[0] for mode, p in preds.items()}
+        for k in [50, 100, 200]
+    }
+
+    results = {
+        "model": model_name,
+        "vocab_size": len(vocab),
+        "seconds": {m: round(s, 3) for m, s in seconds.items()},
+        "tokens_per_second": {m: round(len(vocab) / s, 1) for m, s in seconds.items()},
+        "speedup": round(seconds["fp32"] / seconds["int8"], 2),
+        "cosine_vs_fp32": {
+            "mean": float(cos.mean()),
+            "min": float(cos.min()),
+            "p05": float(np.percentile(cos, 5)),
+        },
+        "precision_at_k": {
+            str(k): {**p, "delta": p["int8"] - p["fp32"]} for k, p in precision.items()
+        },
+    }
+
+    out_path = project_root / "results" / "quantization_comparison.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{len(vocab)} tokens")
+    for mode in stores:
+        print(f"{mode:<5} {seconds[mode]:>8.2f}s  {results['tokens_per_second'][mode]:>10.1f} tokens/s")
+    print(f"speedup: {results['speedup']}x")
+    print(
+        "cosine int8 vs fp32: mean={mean:.4f} min={min:.4f} p05={p05:.4f}".format(
+            **results["cosine_vs_fp32"]
+        )
+    )
+    for k, p in results["precision_at_k"].items():
+        print(f"P@{k}: fp32={p['fp32']:.3f} int8={p['int8']:.3f} (delta {p['delta']:+.3f})")
+    print("Saved:", out_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,21 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parents[1]
 sys.path.append(str(project_root))
 
-from src.glossex.saliency import compute_saliency
+from src.glossex.saliency import compute_saliency_from_counts
+from src.glossex.general_freq import zipf_table
+from src.glossex.token_store import load_token_ids, token_counts
 from src.utils.demo_outputs import save_top_saliency_table, save_final_terms_table
 
 
 def main():
-    tokens_path = project_root / "data" / "processed" / "processed_tokens.json"
+    tokens_prefix = project_root / "data" / "processed" / "processed_tokens"
     final_terms_path = project_root / "data" / "processed" / "final_terms.json"
     out_dir = project_root / "demo" / "outputs"
 
-    with open(tokens_path, "r", encoding="utf-8") as f:
-        tokens = json.load(f)
+    ids, vocab = load_token_ids(str(tokens_prefix))
+    zipf = zipf_table(vocab, str(project_root / "data" / "processed" / "zipf_table.npz"))
 
-    saliency = compute_saliency(tokens)
+    saliency = compute_saliency_from_counts(vocab, token_counts(ids, vocab), zipf=zipf)
     df_sal = save_top_saliency_table(saliency, str(out_dir / "top_saliency_terms.csv"), top_k=20)
 
     with open(final_terms_path, "r", encoding="utf-8") as f:
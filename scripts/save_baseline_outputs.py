@@ -4,21 +4,22 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parents[1]
 sys.path.append(str(project_root))
 
-import json
 import pandas as pd
 
-from src.baselines.tfidf_baseline import tfidf_top_terms
+from src.baselines.tfidf_baseline import tfidf_top_terms_from_counts
+from src.glossex.general_freq import zipf_table
+from src.glossex.token_store import load_token_ids, token_counts
 
 
 def main():
     out_dir = project_root / "demo" / "outputs"
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    tokens_path = project_root / "data" / "processed" / "processed_tokens.json"
-    with open(tokens_path, "r", encoding="utf-8") as f:
-        tokens = json.load(f)
+    tokens_prefix = project_root / "data" / "processed" / "processed_tokens"
+    ids, vocab = load_token_ids(str(tokens_prefix))
+    zipf = zipf_table(vocab, str(project_root / "data" / "processed" / "zipf_table.npz"))
 
-    top = tfidf_top_terms(tokens, top_k=20)
+    top = tfidf_top_terms_from_counts(vocab, token_counts(ids, vocab), top_k=20, zipf=zipf)
     df = pd.DataFrame(top, columns=["term", "score"])
 
     out_path = out_dir / "tfidf_baseline_top_terms.csv"
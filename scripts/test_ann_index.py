@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to PYTHONPATH
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from src.glossex.ann_index import build_index, expand_seed_lists
+
+
+def make_embeddings():
+    """
+    Two groups of terms around an "econ" and a "general" direction, plus
+    "bridge" terms halfway between them that are close to seeds of both.
+    """
+    rng = np.random.default_rng(0)
+    econ, general = np.eye(16)[0], np.eye(16)[1]
+    embeddings = {}
+    for i in range(20):
+        embeddings[f"econ{i}"] = econ + 0.05 * rng.standard_normal(16)
+        embeddings[f"general{i}"] = general + 0.05 * rng.standard_normal(16)
+    for i in range(5):
+        embeddings[f"bridge{i}"] = econ + general + 0.01 * rng.standard_normal(16)
+    return embeddings
+
+
+def test_expanded_seed_lists_do_not_overlap():
+    index = build_index(make_embeddings(), n_lists=4, n_components=None)
+    econ_seeds, general_seeds = ["econ0", "econ1"], ["general0", "general1"]
+
+    econ, general = expand_seed_lists(index, econ_seeds, general_seeds, k=30)
+
+    assert econ[:2] == econ_seeds and general[:2] == general_seeds
+    assert len(econ) > 2 and len(general) > 2
+    assert not set(econ) & set(general)
+    # the bridge terms are neighbours of both lists, so neither keeps them
+    assert not any(t.startswith("bridge") for t in econ + general)
+
+
+if __name__ == "__main__":
+    test_expanded_seed_lists_do_not_overlap()
+    print("OK: expanded seed lists are disjoint.")
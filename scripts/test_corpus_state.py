@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to PYTHONPATH
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from src.glossex import corpus_state
+from src.glossex.corpus_state import empty_state, ingest, merge_states, ngram_tfidf
+from src.glossex.ngram_stats import fit_ngram_tfidf, split_docs
+from src.glossex.preprocess import preprocess_text
+
+LINES = [
+    "Central banks raise interest rates to fight inflation.",
+    "Higher interest rates slow consumer spending and business investment.",
+    "Inflation expectations shape wage bargaining in the labour market.",
+    "",
+    "The labour market tightened as unemployment fell to record lows.",
+    "Fiscal policy and monetary policy interact through interest rates.",
+    "Consumer spending recovered once inflation expectations settled.",
+    "Business investment depends on credit conditions and interest rates.",
+    "Unemployment insurance supports consumer spending in downturns.",
+    "Monetary policy transmission runs through credit conditions.",
+    "Wage bargaining reacts to inflation expectations with a lag.",
+    "Central banks publish forecasts of inflation and unemployment.",
+]
+
+
+def text_of(lines):
+    return "".join(line + "\n" for line in lines)
+
+
+def assert_same(state, text, min_df=2):
+    terms, scores = ngram_tfidf(state, min_df)
+    expected_terms, expected_scores = fit_ngram_tfidf(split_docs(text), min_df=min_df)
+    assert list(terms) == list(expected_terms)
+    assert np.array_equal(scores, expected_scores)
+
+    counts = dict(zip(state["unigram_vocab"], state["unigram_counts"].tolist()))
+    assert counts == Counter(preprocess_text(text, "regex"))
+
+
+def test_batches_equal_full_rebuild():
+    state = empty_state()
+    for start in range(0, len(LINES), 4):
+        ingest(state, text_of(LINES[start:start + 4]), "regex")
+    assert_same(state, text_of(LINES))
+
+
+def test_merged_states_equal_full_rebuild():
+    parts = []
+    for batch in (LINES[:3], LINES[3:7], LINES[7:]):
+        state = empty_state()
+        ingest(state, text_of(batch), "regex")
+        parts.append(state)
+    merged = merge_states(merge_states(parts[0], parts[1]), parts[2])
+    assert_same(merged, text_of(LINES))
+
+
+def test_small_corpus_falls_back_to_one_document():
+    state = empty_state()
+    ingest(state, text_of(LINES[:2]), "regex")
+    ingest(state, text_of(LINES[2:4]), "regex")
+    # one document: min_df=2 would leave nothing to fit
+    assert_same(state, text_of(LINES[:4]), min_df=1)
+
+
+def test_main_rebuilds_after_outside_edit():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            os.makedirs("data/raw")
+            corpus = "data/raw/economics_sample.txt"
+            with open(corpus, "w", encoding="utf-8") as f:
+                f.write(text_of(LINES[:6]))
+            corpus_state.main(tokenizer="regex")
+
+            # edited outside append_to_corpus, then a batch arrives
+            with open(corpus, "w", encoding="utf-8") as f:
+                f.write(text_of(LINES[:3] + LINES[4:8]))
+            with open("batch.txt", "w", encoding="utf-8") as f:
+                f.write(text_of(LINES[8:]))
+            corpus_state.main(batch_path="batch.txt", tokenizer="regex")
+
+            state = corpus_state.load_state("data/processed/corpus_state.npz")
+            with open(corpus, encoding="utf-8") as f:
+                text = f.read()
+        finally:
+            os.chdir(cwd)
+
+    assert text == text_of(LINES[:3] + LINES[4:])
+    assert_same(state, text)
+
+
+if __name__ == "__main__":
+    test_batches_equal_full_rebuild()
+    test_merged_states_equal_full_rebuild()
+    test_small_corpus_falls_back_to_one_document()
+    test_main_rebuilds_after_outside_edit()
+    print("OK: corpus state equals a full rebuild.")
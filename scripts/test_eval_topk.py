@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to PYTHONPATH
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from evaluation.eval_topk import evaluate_at_k, evaluate_systems
+
+# 60 gold terms; "good" finds 30 of them in its top 100 and "weak" 10,
+# spread evenly over the list
+GOLD = {f"gold{i}" for i in range(60)}
+SYSTEMS = {
+    "good": [f"gold{i // 3}" if i % 3 == 0 else f"miss{i}" for i in range(90)]
+    + [f"miss{i}" for i in range(90, 100)],
+    "weak": [f"gold{i // 10}" if i % 10 == 0 else f"miss{i}" for i in range(100)],
+}
+KS = (25, 50, 100)
+METRICS = ("precision", "recall", "f1")
+
+
+def test_point_estimates_match_evaluate_at_k():
+    results = evaluate_systems(SYSTEMS, GOLD, ks=KS, n_boot=0)
+    for name, preds in SYSTEMS.items():
+        for i, k in enumerate(KS):
+            expected = evaluate_at_k(preds, GOLD, k)
+            for m, value in zip(METRICS, expected):
+                assert np.isclose(results["systems"][name][m][i], value)
+
+
+def test_intervals_contain_point_estimates():
+    results = evaluate_systems(SYSTEMS, GOLD, ks=KS, n_boot=2000, reference="weak", n_jobs=1)
+    for name, r in results["systems"].items():
+        for m in METRICS:
+            for i, value in enumerate(r[m]):
+                assert r["ci"][m]["low"][i] <= value <= r["ci"][m]["high"][i], (name, m, KS[i])
+
+    delta = results["systems"]["good"]["delta_vs_reference"]
+    for m in METRICS:
+        for i, value in enumerate(delta[m]["value"]):
+            assert delta[m]["low"][i] <= value <= delta[m]["high"][i], (m, KS[i])
+
+
+if __name__ == "__main__":
+    test_point_estimates_match_evaluate_at_k()
+    test_intervals_contain_point_estimates()
+    print("OK: bootstrap intervals contain the point estimates.")
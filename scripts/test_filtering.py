@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to PYTHONPATH
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from src.glossex import clustering, filtering
+from src.glossex.embedding_store import save_embedding_store
+
+N_CLUSTERS = 50
+
+
+def write_fixture(rng, centers):
+    """
+    Four tokens around each center, one cluster per center, and seeds
+    taken from the first two clusters.
+    """
+    embeddings = {
+        f"t{c}_{j}": centers[c] + 0.01 * rng.standard_normal(centers.shape[1])
+        for c in range(N_CLUSTERS)
+        for j in range(4)
+    }
+    clusters = {str(c): [f"t{c}_{j}" for j in range(4)] for c in range(N_CLUSTERS)}
+
+    os.makedirs("data/processed")
+    os.makedirs("data/seeds")
+    save_embedding_store(embeddings, "data/processed/lemma_embeddings")
+    with open("data/processed/clusters.json", "w") as f:
+        json.dump(clusters, f)
+    with open("data/processed/changed_clusters.json", "w") as f:
+        json.dump(list(clusters), f)
+    with open("data/seeds/economics.txt", "w") as f:
+        f.write("t0_0\nt0_1\n")
+    with open("data/seeds/general.txt", "w") as f:
+        f.write("t1_0\nt1_1\n")
+    return embeddings
+
+
+def test_incremental_run_rescores_only_changed_clusters():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((N_CLUSTERS, 8))
+    cwd = os.getcwd()
+    score_clusters = filtering.score_clusters
+    scored = []
+
+    def recording_score_clusters(clusters, *args, **kwargs):
+        scored.extend(clusters)
+        return score_clusters(clusters, *args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            embeddings = write_fixture(rng, centers)
+            filtering.main(incremental=True)
+
+            # five new lemmas, each next to a different cluster; the store is
+            # rewritten as a whole, the old vectors stay the same
+            new_ids = [3, 11, 20, 34, 47]
+            for c in new_ids:
+                embeddings[f"new{c}"] = centers[c] + 0.01 * rng.standard_normal(8)
+            save_embedding_store(embeddings, "data/processed/lemma_embeddings")
+            clustering.main(incremental=True)
+
+            filtering.score_clusters = recording_score_clusters
+            filtering.main(incremental=True)
+            filtering.score_clusters = score_clusters
+
+            with open("data/processed/cluster_scores.json") as f:
+                cached = json.load(f)["scores"]
+            with open("data/processed/clusters.json") as f:
+                clusters = json.load(f)
+            store = filtering.load_embedding_store("data/processed/lemma_embeddings")
+            full = score_clusters(clusters, store, ["t0_0", "t0_1"], ["t1_0", "t1_1"])
+        finally:
+            filtering.score_clusters = score_clusters
+            os.chdir(cwd)
+
+    assert sorted(scored, key=int) == [str(c) for c in new_ids]
+    assert cached.keys() == full.keys()
+    assert all(np.isclose(cached[cid], full[cid]) for cid in full)
+
+
+if __name__ == "__main__":
+    test_incremental_run_rescores_only_changed_clusters()
+    print("OK: only the changed clusters were re-scored.")
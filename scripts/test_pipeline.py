@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to PYTHONPATH
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from src.glossex import filtering
+from src.glossex.pipeline import GlossaryPipeline
+
+# "Inflation" and "Wage" match no (lowercase) token for filtering.py, which
+# keeps the case, but do for rank_phrases.py, which lowercases
+ECON_SEEDS = "Inflation\nmarket\nprice\n"
+GENERAL_SEEDS = "Wage\nhouse\nriver\n"
+VOCAB = ["inflation", "market", "price", "wage", "house", "river"] + [f"w{i}" for i in range(34)]
+
+
+def test_mixed_case_seeds_match_stage_scripts():
+    rng = np.random.default_rng(0)
+    embeddings = {t: rng.standard_normal(8).astype(np.float32) for t in VOCAB}
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            os.makedirs("data/seeds")
+            with open("data/seeds/economics.txt", "w") as f:
+                f.write(ECON_SEEDS)
+            with open("data/seeds/general.txt", "w") as f:
+                f.write(GENERAL_SEEDS)
+
+            pipe = GlossaryPipeline()
+            pipe.set_embeddings(embeddings)
+            pipe.final_terms()
+            pipe.save("data/processed", final_csv=None)
+
+            filtering.main()
+            with open("data/processed/cluster_scores.json") as f:
+                script_scores = json.load(f)["scores"]
+            with open("data/processed/final_terms.json") as f:
+                script_terms = json.load(f)
+            ranking_seeds = pipe.seeds("ranking")
+        finally:
+            os.chdir(cwd)
+
+    assert pipe.cluster_scores().keys() == script_scores.keys()
+    assert all(np.isclose(pipe.cluster_scores()[c], s) for c, s in script_scores.items())
+    assert pipe.final_terms() == script_terms
+    assert ranking_seeds == (["inflation", "market", "price"], ["wage", "house", "river"])
+
+
+if __name__ == "__main__":
+    test_mixed_case_seeds_match_stage_scripts()
+    print("OK: pipeline seeds match the stage scripts.")
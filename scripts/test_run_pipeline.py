@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to PYTHONPATH
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from src.glossex.run_pipeline import Stage, run_pipeline
+
+# the stages below run main() of this module in worker processes
+MODULE = "scripts.test_run_pipeline"
+
+
+def main(name, inputs, output):
+    """
+    Tiny stage: lowercased, concatenated inputs. Every run is logged.
+    """
+    text = "".join(Path(p).read_text(encoding="utf-8").lower() for p in inputs)
+    Path(output).write_text(text, encoding="utf-8")
+    with open("runs.log", "a", encoding="utf-8") as f:
+        f.write(name + "\n")
+
+
+def stage(name, inputs, output):
+    return Stage(name, MODULE, inputs, [output], {"name": name, "inputs": inputs, "output": output})
+
+
+#   raw_a -> a --+
+#                +-> c -> d
+#   raw_b -> b --+
+STAGES = [
+    stage("a", ["raw_a.txt"], "a.txt"),
+    stage("b", ["raw_b.txt"], "b.txt"),
+    stage("c", ["a.txt", "b.txt"], "c.txt"),
+    stage("d", ["c.txt"], "d.txt"),
+]
+
+
+def run():
+    if os.path.exists("runs.log"):
+        os.remove("runs.log")
+    status = run_pipeline(STAGES, max_workers=2, state_path="state.json")
+    ran = Path("runs.log").read_text().split() if os.path.exists("runs.log") else []
+    assert sorted(ran) == sorted(name for name, s in status.items() if s == "ran")
+    return {name for name, s in status.items() if s == "ran"}
+
+
+def test_only_changed_stages_rerun():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            Path("raw_a.txt").write_text("alpha\n")
+            Path("raw_b.txt").write_text("beta\n")
+
+            assert run() == {"a", "b", "c", "d"}
+            assert run() == set()
+
+            # b's input changes: b and everything downstream of it re-run
+            Path("raw_b.txt").write_text("beta gamma\n")
+            assert run() == {"b", "c", "d"}
+
+            # a's input changes but its output does not: only a re-runs
+            Path("raw_a.txt").write_text("ALPHA\n")
+            assert run() == {"a"}
+
+            # a deleted output is rebuilt
+            os.remove("d.txt")
+            assert run() == {"d"}
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_only_changed_stages_rerun()
+    print("OK: only stages with changed inputs re-ran.")
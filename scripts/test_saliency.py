@@ -1,4 +1,3 @@
-import json
 import sys
 from pathlib import Path
 
@@ -6,13 +5,15 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parents[1]
 sys.path.append(str(project_root))
 
-from src.glossex.saliency import compute_saliency
+from src.glossex.saliency import compute_saliency_from_counts
+from src.glossex.general_freq import zipf_table
+from src.glossex.token_store import load_token_ids, token_counts
 
 
-with open("data/processed/processed_tokens.json", "r") as f:
-    tokens = json.load(f)
+ids, vocab = load_token_ids("data/processed/processed_tokens")
+zipf = zipf_table(vocab, "data/processed/zipf_table.npz")
 
-scores = compute_saliency(tokens)
+scores = compute_saliency_from_counts(vocab, token_counts(ids, vocab), zipf=zipf)
 
 top_terms = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:10]
 
@@ -0,0 +1,56 @@
+import sys
+from collections import Counter
+from pathlib import Path
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Add project root to PYTHONPATH
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from src.glossex.ngram_stats import vectorizer_params
+from src.glossex.preprocess import preprocess_text
+from src.glossex.tokenization import regex_tokenize, word_ngrams
+
+# one instance of every known way the two tokenizers disagree; none of the
+# differing tokens is an NLTK stop word
+TEXT = (
+    "Mr. Smith, a Ph.D. economist, said Plan B was gonna hold. "
+    "The supply--demand gap closed at 5 o'clock in São Paulo."
+)
+
+# tokens only NLTK keeps:
+#   "b": single letter, the TF-IDF pattern needs 2+ characters
+#   "gon", "na": Treebank splits fused words ("gonna" -> "gon na")
+#   "supply", "demand": NLTK splits "--", the regex keeps "supply--demand"
+#       (dropped afterwards as non-alphabetic)
+#   "são": the TF-IDF pattern only matches [a-zA-Z]
+NLTK_ONLY = Counter({"b": 1, "gon": 1, "na": 1, "supply": 1, "demand": 1, "são": 1})
+
+# tokens only the regex keeps:
+#   "mr", "ph": NLTK keeps "Mr." / "Ph.D." whole (dropped as non-alphabetic)
+#   "gonna": kept whole
+#   "clock": NLTK keeps "o'clock" whole, the regex drops the single "o"
+REGEX_ONLY = Counter({"mr": 1, "ph": 1, "gonna": 1, "clock": 1})
+
+
+def test_token_differences():
+    nltk_counts = Counter(preprocess_text(TEXT, tokenizer="nltk"))
+    regex_counts = Counter(preprocess_text(TEXT, tokenizer="regex"))
+
+    assert nltk_counts - regex_counts == NLTK_ONLY
+    assert regex_counts - nltk_counts == REGEX_ONLY
+
+
+def test_regex_matches_tfidf_analyzer():
+    params = vectorizer_params((2, 3), 1)
+    vec = TfidfVectorizer(**params)
+
+    assert regex_tokenize(TEXT) == vec.build_tokenizer()(vec.build_preprocessor()(TEXT))
+    assert word_ngrams(regex_tokenize(TEXT), (2, 3)) == vec.build_analyzer()(TEXT)
+
+
+if __name__ == "__main__":
+    test_token_differences()
+    test_regex_matches_tfidf_analyzer()
+    print("OK: tokenizer differences match the expected ones.")
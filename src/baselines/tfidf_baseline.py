@@ -1,9 +1,12 @@
-import json
 from collections import Counter
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 
+from ..glossex.general_freq import zipf_table
+from ..glossex.ranking import top_k as top_k_indices
+from ..glossex.token_store import load_token_ids, token_counts
+
 
 def tfidf_top_terms(tokens: List[str], top_k: int = 20) -> List[Tuple[str, float]]:
     """
@@ -13,28 +16,42 @@ def tfidf_top_terms(tokens: List[str], top_k: int = 20) -> List[Tuple[str, float
       to penalize common words.
     This keeps the baseline lightweight and reproducible.
     """
-    from wordfreq import zipf_frequency
-
     counts = Counter(tokens)
-    total = sum(counts.values())
+    return tfidf_top_terms_from_counts(list(counts), list(counts.values()), top_k)
 
-    scores = {}
-    for term, c in counts.items():
-        tf = c / total
-        general_zipf = zipf_frequency(term, "en")
-        # Higher Zipf => more common => lower idf
-        idf_like = 1.0 / (1.0 + max(general_zipf, 0.0))
-        scores[term] = tf * idf_like
 
-    top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
-    return top
+def tfidf_top_terms_from_counts(
+    vocab: Sequence[str],
+    counts: Sequence[int],
+    top_k: int = 20,
+    zipf: Optional[np.ndarray] = None,
+) -> List[Tuple[str, float]]:
+    """
+    tfidf_top_terms over precomputed counts (e.g. the np.bincount of the
+    token-id artifact). Zero counts are skipped. `zipf` is the
+    general_freq.zipf_table of `vocab`, looked up if not given.
+    """
+    counts = np.asarray(counts, dtype=float)
+    if zipf is None:
+        zipf = zipf_table(vocab)
+
+    keep = np.flatnonzero(counts)
+    tf = counts[keep] / counts.sum()
+    # Higher Zipf => more common => lower idf
+    idf_like = 1.0 / (1.0 + np.maximum(zipf[keep], 0.0))
+    scores = tf * idf_like
+
+    # ties keep vocabulary order like sorted() did
+    order = top_k_indices(scores, top_k)
+    return [(vocab[i], s) for i, s in zip(keep[order].tolist(), scores[order].tolist())]
 
 
 def main():
-    with open("data/processed/processed_tokens.json", "r", encoding="utf-8") as f:
-        tokens = json.load(f)
+    ids, vocab = load_token_ids("data/processed/processed_tokens")
+
+    zipf = zipf_table(vocab, "data/processed/zipf_table.npz")
 
-    top = tfidf_top_terms(tokens, top_k=20)
+    top = tfidf_top_terms_from_counts(vocab, token_counts(ids, vocab), top_k=20, zipf=zipf)
 
     print("TF-IDF baseline (top 20):")
     for term, score in top:
@@ -0,0 +1,302 @@
+import json
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .embedding_store import embedding_fingerprint, embedding_matrix
+from .projection import fit_projection
+from .ranking import top_k
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-9)
+
+
+class IVFIndex:
+    """
+    Inverted-file index for cosine nearest neighbours over an embedding
+    store. The unit vectors are split into `n_lists` spherical k-means
+    cells; a query scans only the `n_probe` cells whose centroids are
+    closest, using low-dimensional (PCA) copies of the vectors, and the
+    best candidates are re-ranked with the exact cosine of the full
+    vectors (cosine_matrix's formula).
+
+    Rows are stored grouped by cell, so every scanned cell is one
+    contiguous matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        centroids: np.ndarray,
+        components: Optional[np.ndarray],
+        vectors: np.ndarray,
+        ids: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.embeddings = embeddings
+        self.tokens = list(embeddings.keys())
+        self.index = {t: i for i, t in enumerate(self.tokens)}
+        self.full = embedding_matrix(embeddings, self.tokens)
+        self.centroids = centroids
+        self.components = components
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def _reduce(self, unit: np.ndarray) -> np.ndarray:
+        return unit if self.components is None else unit @ self.components.T
+
+    def search(
+        self, vector: np.ndarray, k: int = 10, n_probe: int = 8, rerank: int = 200
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (row ids, cosines) of the approximate `k` nearest rows, best first.
+        The top max(k, rerank) candidates of the scanned cells are scored
+        exactly.
+        """
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) + 1e-9)
+        qr = self._reduce(q)
+
+        cells = top_k(self.centroids @ qr, n_probe)
+        ids, scores = [], []
+        for c in cells.tolist():
+            start, end = self.offsets[c], self.offsets[c + 1]
+            if end > start:
+                ids.append(self.ids[start:end])
+                scores.append(self.vectors[start:end] @ qr)
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+
+        candidates = np.sort(ids[top_k(scores, max(k, rerank))])
+        rows = np.asarray(self.full[candidates], dtype=np.float64)
+        exact = (rows @ q) / (np.linalg.norm(rows, axis=1) * np.linalg.norm(q) + 1e-9)
+        best = top_k(exact, k)
+        return candidates[best], exact[best]
+
+    def neighbors(
+        self, term: str, k: int = 10, n_probe: int = 8, rerank: int = 200
+    ) -> List[Tuple[str, float]]:
+        """
+        The `k` terms closest to `term` (itself excluded) as (term, cosine).
+        """
+        ids, sims = self.search(self.full[self.index[term]], k + 1, n_probe, rerank)
+        out = [
+            (self.tokens[i], float(s)) for i, s in zip(ids.tolist(), sims) if self.tokens[i] != term
+        ]
+        return out[:k]
+
+    def save(self, path: str, fingerprint: str, params: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            centroids=self.centroids,
+            components=self.components if self.components is not None else np.zeros((0, 0)),
+            vectors=self.vectors,
+            ids=self.ids,
+            offsets=self.offsets,
+            fingerprint=fingerprint,
+            params=params,
+        )
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        labels[start:start + chunk_size] = np.argmax(
+            vectors[start:start + chunk_size] @ centroids.T, axis=1
+        )
+    return labels
+
+
+def build_index(
+    embeddings,
+    n_lists: Optional[int] = None,
+    n_components: Optional[int] = 64,
+    n_iter: int = 10,
+    sample_size: int = 100000,
+    random_state: int = 0,
+) -> IVFIndex:
+    """
+    Build an IVFIndex. `n_lists` defaults to about 2 * sqrt(n) cells;
+    the cells are fitted by spherical k-means on a sample of at most
+    `sample_size` vectors. With `n_components`, cells are scanned in that
+    many PCA dimensions (see projection.fit_projection); None scans the
+    full vectors.
+    """
+    tokens = list(embeddings.keys())
+    unit = _unit_rows(embedding_matrix(embeddings, tokens))
+    n, dim = unit.shape
+
+    components = None
+    if n_components is not None and n_components < dim:
+        components = fit_projection(unit, n_components, "pca").astype(np.float32)
+        unit = unit @ components.T
+
+    n_lists = max(1, min(n, n_lists or int(round(2 * np.sqrt(n)))))
+    rng = np.random.default_rng(random_state)
+    sample = unit[rng.choice(n, min(n, max(sample_size, n_lists)), replace=False)]
+
+    centroids = _unit_rows(sample[rng.choice(len(sample), n_lists, replace=False)])
+    for _ in range(n_iter):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.bincount(labels, minlength=n_lists) == 0
+        # restart empty cells from random sample points
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = _unit_rows(sums)
+
+    labels = _assign(unit, centroids)
+    ids = np.argsort(labels, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+
+    return IVFIndex(
+        embeddings, centroids, components, np.ascontiguousarray(unit[ids]), ids, offsets
+    )
+
+
+def load_or_build_index(
+    embeddings,
+    path: str = "data/processed/lemma_embeddings.ann.npz",
+    n_lists: Optional[int] = None,
+    n_components: Optional[int] = 64,
+    random_state: int = 0,
+) -> IVFIndex:
+    """
+    Index built once and kept at `path`, rebuilt only when the embeddings
+    (fingerprint) or the parameters change.
+    """
+    params = json.dumps(
+        {"n_lists": n_lists, "n_components": n_components, "random_state": random_state},
+        sort_keys=True,
+    )
+    fingerprint = embedding_fingerprint(embeddings)
+
+    if Path(path).exists():
+        cached = np.load(path)
+        if str(cached["fingerprint"]) == fingerprint and str(cached["params"]) == params:
+            components = cached["components"]
+            return IVFIndex(
+                embeddings,
+                cached["centroids"],
+                components if components.size else None,
+                cached["vectors"],
+                cached["ids"],
+                cached["offsets"],
+            )
+
+    index = build_index(embeddings, n_lists, n_components, random_state=random_state)
+    index.save(path, fingerprint, params)
+    return index
+
+
+def exact_search(
+    embeddings, queries: np.ndarray, k: int = 10, batch_size: int = 32, chunk_size: int = 8192
+) -> np.ndarray:
+    """
+    Row ids of the exact `k` nearest rows (cosine) for each query row,
+    by brute force over the whole store (`batch_size` queries at a time).
+    """
+    tokens = list(embeddings.keys())
+    full = embedding_matrix(embeddings, tokens)
+    q = np.asarray(queries, dtype=np.float64)
+    q = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-9)
+
+    out = []
+    for b in range(0, len(q), batch_size):
+        batch = q[b:b + batch_size]
+        sims = np.empty((len(batch), len(tokens)))
+        for start in range(0, len(tokens), chunk_size):
+            rows = np.asarray(full[start:start + chunk_size], dtype=np.float64)
+            sims[:, start:start + chunk_size] = (batch @ rows.T) / (
+                np.linalg.norm(rows, axis=1) + 1e-9
+            )
+        out.extend(top_k(s, k) for s in sims)
+    return np.array(out, dtype=np.int64).reshape(len(q), -1)
+
+
+def index_recall(
+    index: IVFIndex, query_terms: List[str], k: int = 10, n_probe: int = 8, rerank: int = 200
+) -> float:
+    """
+    Mean fraction of the exact k nearest neighbours the index returns.
+    """
+    if not query_terms:
+        return 0.0
+    queries = np.asarray(index.full[[index.index[t] for t in query_terms]])
+    exact = exact_search(index.embeddings, queries, k)
+    found = [
+        len(set(index.search(q, k, n_probe, rerank)[0].tolist()) & set(e.tolist())) / k
+        for q, e in zip(queries, exact)
+    ]
+    return float(np.mean(found))
+
+
+def expand_seeds(
+    index: IVFIndex,
+    seeds: List[str],
+    k: int = 5,
+    min_similarity: float = 0.0,
+    exclude: Iterable[str] = (),
+    n_probe: int = 8,
+) -> List[str]:
+    """
+    The seeds followed by up to `k` nearest terms of each seed (cosine of
+    at least `min_similarity`), new terms ordered by their best
+    similarity to any seed. Terms in `exclude` (e.g. the other seed list)
+    are never added.
+    """
+    exclude = set(exclude) | set(seeds)
+    best = {}
+    for seed in seeds:
+        if seed not in index.index:
+            continue
+        for term, sim in index.neighbors(seed, k, n_probe):
+            if term not in exclude and sim >= min_similarity:
+                best[term] = max(sim, best.get(term, -np.inf))
+
+    new = list(best)
+    order = top_k(np.array([best[t] for t in new]), None)
+    return list(seeds) + [new[i] for i in order.tolist()]
+
+
+def expand_seed_lists(
+    index: IVFIndex,
+    econ_seeds: List[str],
+    general_seeds: List[str],
+    k: int = 5,
+    min_similarity: float = 0.0,
+    n_probe: int = 8,
+) -> Tuple[List[str], List[str]]:
+    """
+    Both seed lists expanded with expand_seeds, kept apart: neither list
+    gains a seed of the other, and a new term found from both lists is
+    dropped from both rather than counted on each side.
+    """
+    econ = expand_seeds(index, econ_seeds, k, min_similarity, general_seeds, n_probe)
+    general = expand_seeds(index, general_seeds, k, min_similarity, econ_seeds, n_probe)
+    shared = set(econ[len(econ_seeds):]) & set(general[len(general_seeds):])
+    return (
+        list(econ_seeds) + [t for t in econ[len(econ_seeds):] if t not in shared],
+        list(general_seeds) + [t for t in general[len(general_seeds):] if t not in shared],
+    )
+
+
+def terms_near(index: IVFIndex, seeds: List[str], k: int = 50, n_probe: int = 8) -> Set[str]:
+    """
+    The seeds in the index and their `k` nearest terms each.
+    """
+    near = set()
+    for seed in seeds:
+        if seed in index.index:
+            near.add(seed)
+            near.update(term for term, _ in index.neighbors(seed, k, n_probe))
+    return near
@@ -1,21 +1,66 @@
 import json
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
 import numpy as np
-from sklearn.cluster import AgglomerativeClustering
+from scipy.cluster import hierarchy
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
+from sklearn.neighbors import kneighbors_graph
+
+from .embedding_store import (
+    embedding_fingerprint,
+    embedding_matrix,
+    load_embedding_store,
+)
+
+
+CLUSTER_METHODS = ("agglomerative", "knn_agglomerative", "minibatch_kmeans")
 
 
 def cluster_embeddings(
-    embeddings: Dict[str, List[float]], n_clusters: int
+    embeddings: Dict[str, List[float]],
+    n_clusters: int,
+    method: str = "agglomerative",
+    n_neighbors: int = 15,
+    random_state: int = 0,
 ) -> Dict[int, List[str]]:
     """
-    Cluster embeddings using Agglomerative Clustering.
+    Cluster token embeddings (Agglomerative Clustering by default).
     Returns a mapping from cluster_id to list of tokens.
+
+    method:
+      - "agglomerative": full Ward clustering (quadratic memory and time)
+      - "knn_agglomerative": Ward merges restricted to a sparse
+        `n_neighbors` kNN connectivity graph
+      - "minibatch_kmeans": MiniBatchKMeans, linear in the vocabulary size
     """
     tokens = list(embeddings.keys())
-    vectors = np.array([embeddings[t] for t in tokens])
+    vectors = embedding_matrix(embeddings, tokens)
+    if vectors.dtype == np.float16:
+        # float16 stores are for storage; sklearn computes in float32/64
+        vectors = vectors.astype(np.float32)
+
+    if method == "agglomerative":
+        clustering = AgglomerativeClustering(n_clusters=n_clusters)
+    elif method == "knn_agglomerative":
+        connectivity = kneighbors_graph(
+            vectors, n_neighbors=min(n_neighbors, len(tokens) - 1), include_self=False
+        )
+        clustering = AgglomerativeClustering(
+            n_clusters=n_clusters, connectivity=connectivity
+        )
+    elif method == "minibatch_kmeans":
+        clustering = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=max(1024, 3 * n_clusters),
+            n_init=3,
+            random_state=random_state,
+        )
+    else:
+        raise ValueError(
+            f"Unknown clustering method: {method} (expected one of {CLUSTER_METHODS})"
+        )
 
-    clustering = AgglomerativeClustering(n_clusters=n_clusters)
     labels = clustering.fit_predict(vectors)
 
     clusters = {}
@@ -25,21 +70,174 @@ def cluster_embeddings(
     return clusters
 
 
-def main():
-    with open("data/processed/lemma_embeddings.json", "r") as f:
-        embeddings = json.load(f)
+def ward_linkage(embeddings) -> np.ndarray:
+    """
+    Full Ward merge tree of the embeddings, in their key order.
+    """
+    tokens = list(embeddings.keys())
+    return hierarchy.ward(np.asarray(embedding_matrix(embeddings, tokens), dtype=float))
+
+
+def load_or_compute_linkage(
+    embeddings, path: str = "data/processed/linkage.npz"
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Full Ward merge tree of the embeddings (the same tree sklearn's
+    AgglomerativeClustering builds), cached on disk. The cache is keyed by
+    the embedding fingerprint and recomputed when the embeddings change.
+    """
+    tokens = list(embeddings.keys())
+    fingerprint = embedding_fingerprint(embeddings)
+
+    if Path(path).exists():
+        cached = np.load(path)
+        if str(cached["fingerprint"]) == fingerprint:
+            return tokens, cached["linkage"]
+
+    linkage = ward_linkage(embeddings)
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, linkage=linkage, fingerprint=fingerprint)
+    return tokens, linkage
+
+
+def cut_linkage(
+    tokens: List[str],
+    linkage: np.ndarray,
+    n_clusters: Optional[int] = None,
+    distance_threshold: Optional[float] = None,
+) -> Dict[int, List[str]]:
+    """
+    Flat clusters from a merge tree, without re-clustering.
+    With `n_clusters`, the last n_clusters - 1 merges are undone (as in
+    AgglomerativeClustering); with `distance_threshold`, only merges below
+    the threshold are kept.
+    """
+    n = len(tokens)
+    if n_clusters is not None:
+        n_merges = n - min(max(n_clusters, 1), n)
+    elif distance_threshold is not None:
+        n_merges = int(np.searchsorted(linkage[:, 2], distance_threshold, side="left"))
+    else:
+        raise ValueError("Either n_clusters or distance_threshold is required")
+
+    # merged nodes always have a larger id than their children, so a single
+    # top-down pass resolves every leaf to its root
+    parent = np.arange(n + n_merges)
+    children = linkage[:n_merges, :2].astype(np.int64)
+    parent[children[:, 0]] = np.arange(n, n + n_merges)
+    parent[children[:, 1]] = np.arange(n, n + n_merges)
+    for node in range(n + n_merges - 1, -1, -1):
+        parent[node] = parent[parent[node]]
+
+    ids = {}
+    clusters = {}
+    for token, root in zip(tokens, parent[:n]):
+        clusters.setdefault(ids.setdefault(int(root), len(ids)), []).append(token)
+
+    return clusters
+
+
+def assign_new_tokens(
+    clusters: Dict[int, List[str]],
+    embeddings: Dict[str, List[float]],
+    new_tokens: Optional[List[str]] = None,
+    chunk_size: int = 4096,
+) -> Tuple[Dict[int, List[str]], Set]:
+    """
+    Add tokens to the existing cluster with the nearest centroid
+    (Euclidean, the geometry Ward clustering uses) instead of re-clustering.
+    By default every embedded token that is not yet in a cluster is assigned.
+    Returns the updated clusters and the ids of the clusters that changed.
+    """
+    clustered = {t for members in clusters.values() for t in members}
+    if new_tokens is None:
+        new_tokens = [t for t in embeddings.keys() if t not in clustered]
+    new_tokens = [t for t in new_tokens if t not in clustered and t in embeddings]
+
+    updated = {cid: list(members) for cid, members in clusters.items()}
+    if not new_tokens:
+        return updated, set()
+
+    cids, centroids = [], []
+    for cid, members in clusters.items():
+        members = [t for t in members if t in embeddings]
+        if members:
+            cids.append(cid)
+            vectors = np.asarray(embedding_matrix(embeddings, members), dtype=float)
+            centroids.append(vectors.mean(axis=0))
+    if not cids:
+        return updated, set()
+    centroids = np.array(centroids)
+    centroid_sq = (centroids ** 2).sum(axis=1)
+
+    changed = set()
+    for start in range(0, len(new_tokens), chunk_size):
+        chunk = new_tokens[start:start + chunk_size]
+        vectors = np.asarray(embedding_matrix(embeddings, chunk), dtype=float)
+        # |v - c|^2 up to the per-row constant |v|^2
+        nearest = np.argmin(centroid_sq[None, :] - 2 * vectors @ centroids.T, axis=1)
+        for token, j in zip(chunk, nearest):
+            updated[cids[j]].append(token)
+            changed.add(cids[j])
+
+    return updated, changed
+
+
+def main(
+    method="agglomerative",
+    n_clusters=None,
+    distance_threshold=None,
+    incremental=False,
+    embeddings_path="data/processed/lemma_embeddings",
+):
+    # embeddings_path="data/processed/reduced_embeddings" clusters the
+    # projected vectors (see projection.py)
+    embeddings = load_embedding_store(embeddings_path)
+
+    if incremental and Path("data/processed/clusters.json").exists():
+        with open("data/processed/clusters.json", "r") as f:
+            clusters = json.load(f)
+
+        clusters, changed = assign_new_tokens(clusters, embeddings)
+
+        with open("data/processed/clusters.json", "w") as f:
+            json.dump(clusters, f, indent=2)
+        with open("data/processed/changed_clusters.json", "w") as f:
+            json.dump(sorted(changed), f)
+
+        print(
+            f"Incremental clustering: {len(changed)} of {len(clusters)} "
+            f"clusters received new tokens."
+        )
+        return
 
     vocab_size = len(embeddings)
-    n_clusters = max(2, vocab_size // 4)
+    if distance_threshold is not None and method != "agglomerative":
+        raise ValueError(
+            f"distance_threshold cuts the Ward merge tree; it is only supported with "
+            f"method='agglomerative', not {method!r} (pass n_clusters instead)"
+        )
+    if n_clusters is None and distance_threshold is None:
+        n_clusters = max(2, vocab_size // 4)
 
-    clusters = cluster_embeddings(embeddings, n_clusters)
+    if method == "agglomerative":
+        # cut the cached merge tree instead of refitting
+        tokens, linkage = load_or_compute_linkage(embeddings)
+        clusters = cut_linkage(tokens, linkage, n_clusters, distance_threshold)
+        n_clusters = len(clusters)
+    else:
+        clusters = cluster_embeddings(embeddings, n_clusters, method=method)
 
     with open("data/processed/clusters.json", "w") as f:
         json.dump(clusters, f, indent=2)
+    # a full rebuild invalidates every cluster score
+    with open("data/processed/changed_clusters.json", "w") as f:
+        json.dump([str(cid) for cid in clusters], f)
 
     print(
         f"Clustering completed: {vocab_size} tokens "
-        f"into {n_clusters} clusters."
+        f"into {n_clusters} clusters ({method})."
     )
 
 
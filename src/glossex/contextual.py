@@ -0,0 +1,233 @@
+import json
+import random
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import torch
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from tqdm import tqdm
+
+from .embedding_store import save_embedding_store
+from .embeddings import load_model
+from .ngram_stats import iter_doc_chunks
+from .rank_phrases import load_seed_list
+from .token_store import load_token_ids
+from .tokenization import TOKEN_RE
+
+# (sentence index, char start, char end)
+Occurrence = Tuple[int, int, int]
+
+
+def iter_sentences(corpus_path: str, chunk_lines: int = 10000) -> Iterator[str]:
+    """
+    Corpus sentences, i.e. the pseudo-docs (non-empty lines) used by the
+    n-gram stages.
+    """
+    for chunk in iter_doc_chunks(corpus_path, chunk_lines):
+        yield from chunk
+
+
+def find_occurrences(
+    sentence: str, tokens: Set[str], phrases: Set[str], max_n: int = 3
+) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yield (term, char start, char end) for every token and candidate phrase
+    in `sentence`. Phrases are matched the way the TF-IDF n-grams are built
+    (stop words removed), so "supply and demand" is an occurrence of
+    "supply demand"; its span covers the original text.
+    """
+    words = [(m.group(0).lower(), m.start(), m.end()) for m in TOKEN_RE.finditer(sentence)]
+
+    for w, start, end in words:
+        if w in tokens:
+            yield w, start, end
+
+    content = [x for x in words if x[0] not in ENGLISH_STOP_WORDS]
+    for n in range(2, max_n + 1):
+        for i in range(len(content) - n + 1):
+            ph = " ".join(w for w, _, _ in content[i:i + n])
+            if ph in phrases:
+                yield ph, content[i][1], content[i + n - 1][2]
+
+
+def sample_occurrences(
+    sentences: Iterable[str],
+    tokens: Iterable[str],
+    phrases: Iterable[str] = (),
+    max_per_term: int = 32,
+    random_state: int = 0,
+) -> Dict[str, List[Occurrence]]:
+    """
+    One pass over the corpus keeping at most `max_per_term` occurrences of
+    every term, chosen uniformly by reservoir sampling.
+    """
+    tokens, phrases = set(tokens), set(phrases)
+    max_n = max((len(p.split()) for p in phrases), default=1)
+    rng = random.Random(random_state)
+
+    samples = defaultdict(list)
+    seen = defaultdict(int)
+    for s, sentence in enumerate(sentences):
+        for term, start, end in find_occurrences(sentence, tokens, phrases, max_n):
+            seen[term] += 1
+            reservoir = samples[term]
+            if len(reservoir) < max_per_term:
+                reservoir.append((s, start, end))
+            else:
+                j = rng.randrange(seen[term])
+                if j < max_per_term:
+                    reservoir[j] = (s, start, end)
+
+    return dict(samples)
+
+
+def embed_occurrences(
+    corpus_path: str,
+    samples: Dict[str, List[Occurrence]],
+    model_name: str = "distilbert-base-uncased",
+    batch_size: int = 32,
+    num_threads: Optional[int] = None,
+    quantize: bool = False,
+    local_files_only: bool = False,
+) -> Dict[str, np.ndarray]:
+    """
+    Encode every sampled sentence once and mean-pool the last hidden state
+    over the word pieces of each occurrence span; a term's vector is the
+    mean over its occurrences. Spans cut off by truncation are skipped.
+    See embeddings.load_model for `quantize` and `local_files_only`.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    terms = list(samples)
+    by_sentence = defaultdict(list)
+    for t, occurrences in enumerate(samples.values()):
+        for s, start, end in occurrences:
+            by_sentence[s].append((t, start, end))
+
+    texts = {s: sent for s, sent in enumerate(iter_sentences(corpus_path)) if s in by_sentence}
+    sentence_ids = sorted(texts)
+
+    tokenizer, model = load_model(model_name, quantize, local_files_only)
+
+    encoded = tokenizer(
+        [texts[s] for s in sentence_ids], truncation=True, return_offsets_mapping=True
+    )
+    # bucket by tokenized length to keep padding small
+    order = sorted(range(len(sentence_ids)), key=lambda i: len(encoded["input_ids"][i]))
+
+    sums = np.zeros((len(terms), model.config.hidden_size))
+    counts = np.zeros(len(terms))
+
+    with torch.no_grad():
+        for start in tqdm(range(0, len(order), batch_size), desc="Contextual embeddings"):
+            idx = order[start:start + batch_size]
+            batch = tokenizer.pad(
+                {"input_ids": [encoded["input_ids"][i] for i in idx]}, return_tensors="pt"
+            )
+            hidden = model(**batch).last_hidden_state
+            seq_len = hidden.shape[1]
+
+            # word pieces of every occurrence in the batch (flat positions)
+            owners, rows, cols = [], [], []
+            for b, i in enumerate(idx):
+                offsets = np.array(encoded["offset_mapping"][i]).reshape(-1, 2)
+                for t, span_start, span_end in by_sentence[sentence_ids[i]]:
+                    pieces = np.flatnonzero(
+                        (offsets[:, 0] < span_end)
+                        & (offsets[:, 1] > span_start)
+                        & (offsets[:, 1] > offsets[:, 0])
+                    )
+                    if len(pieces) == 0:
+                        continue
+                    rows.extend([len(owners)] * len(pieces))
+                    cols.extend((b * seq_len + pieces).tolist())
+                    owners.append(t)
+
+            if not owners:
+                continue
+            # mean over each occurrence's pieces; memory grows with the
+            # number of pieces, not occurrences x batch positions
+            rows = torch.tensor(rows)
+            flat = hidden.reshape(-1, hidden.shape[-1])
+            vectors = torch.zeros(len(owners), flat.shape[1], dtype=hidden.dtype)
+            vectors.index_add_(0, rows, flat[torch.tensor(cols)])
+            vectors /= torch.bincount(rows, minlength=len(owners)).unsqueeze(1).to(hidden.dtype)
+            vectors = vectors.numpy()
+
+            np.add.at(sums, owners, vectors)
+            np.add.at(counts, owners, 1)
+
+    found = np.flatnonzero(counts)
+    means = sums[found] / counts[found, None]
+    return {terms[t]: means[k] for k, t in enumerate(found.tolist())}
+
+
+def compute_contextual_embeddings(
+    corpus_path: str,
+    tokens: Iterable[str],
+    phrases: Iterable[str] = (),
+    model_name: str = "distilbert-base-uncased",
+    max_per_term: int = 32,
+    batch_size: int = 32,
+    random_state: int = 0,
+    quantize: bool = False,
+    local_files_only: bool = False,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Contextual vectors for tokens and candidate phrases from their corpus
+    sentences. Cost is bounded by the number of sampled sentences (at most
+    `max_per_term` per term), not by phrases x words.
+    Returns (token vectors, phrase vectors); terms never found are left out.
+    """
+    tokens = set(tokens)
+    phrases = set(phrases) - tokens
+    samples = sample_occurrences(
+        iter_sentences(corpus_path), tokens, phrases, max_per_term, random_state
+    )
+    vectors = embed_occurrences(
+        corpus_path,
+        samples,
+        model_name,
+        batch_size,
+        quantize=quantize,
+        local_files_only=local_files_only,
+    )
+
+    token_vectors = {t: v for t, v in vectors.items() if t in tokens}
+    phrase_vectors = {t: v for t, v in vectors.items() if t in phrases}
+    return token_vectors, phrase_vectors
+
+
+def main(
+    model_name="distilbert-base-uncased", max_per_term=32, quantize=False, local_files_only=False
+):
+    _, vocab = load_token_ids("data/processed/processed_tokens")
+    seeds = load_seed_list("data/seeds/economics.txt") + load_seed_list("data/seeds/general.txt")
+
+    with open("data/processed/phrase_candidates.json", "r", encoding="utf-8") as f:
+        phrases = json.load(f)
+
+    token_vectors, phrase_vectors = compute_contextual_embeddings(
+        "data/raw/economics_sample.txt",
+        set(vocab) | set(seeds),
+        phrases,
+        model_name=model_name,
+        max_per_term=max_per_term,
+        quantize=quantize,
+        local_files_only=local_files_only,
+    )
+
+    save_embedding_store(token_vectors, "data/processed/contextual_embeddings")
+    save_embedding_store(phrase_vectors, "data/processed/phrase_embeddings")
+
+    print(
+        f"Contextual embeddings for {len(token_vectors)} tokens and "
+        f"{len(phrase_vectors)} phrases -> data/processed/contextual_embeddings.npy, "
+        f"data/processed/phrase_embeddings.npy"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import hashlib
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from .ngram_stats import (
+    _idf,
+    fit_ngram_tfidf,
+    ngram_fingerprint,
+    ngram_mode,
+    save_ngram_tfidf,
+    vectorizer_params,
+)
+from .preprocess import iter_shards, preprocess_text
+from .token_store import append_token_ids, save_token_ids
+
+
+# Mergeable corpus statistics, updated batch by batch instead of rebuilt:
+#   unigram_vocab / unigram_counts  preprocessed token counts (saliency)
+#   ngram_terms                     every n-gram seen so far, min_df is applied later
+#   doc_terms                       n-gram counts per pseudo-doc (csr, docs x ngram_terms)
+#   head_text                       raw text while there are < 5 docs (split_docs fallback)
+#   corpus_digest                   sha256 of the raw corpus the state was built from
+#                                   (set by main; None for states not tied to a file)
+
+
+def empty_state(ngram_range: Tuple[int, int] = (2, 3)) -> Dict:
+    return {
+        "ngram_range": tuple(ngram_range),
+        "unigram_vocab": [],
+        "unigram_counts": np.zeros(0, dtype=np.int64),
+        "ngram_terms": [],
+        "doc_terms": sp.csr_matrix((0, 0), dtype=np.int32),
+        "head_text": "",
+        "corpus_digest": None,
+    }
+
+
+def n_docs(state: Dict) -> int:
+    return state["doc_terms"].shape[0]
+
+
+def add_tokens(state: Dict, tokens: List[str]) -> None:
+    """
+    Add preprocessed tokens to the unigram counts.
+    """
+    index = {t: i for i, t in enumerate(state["unigram_vocab"])}
+    ids = np.fromiter(
+        (index.setdefault(t, len(index)) for t in tokens), dtype=np.int64, count=len(tokens)
+    )
+    counts = np.bincount(ids, minlength=len(index))
+    counts[: len(state["unigram_counts"])] += state["unigram_counts"]
+
+    state["unigram_vocab"] = list(index)
+    state["unigram_counts"] = counts
+
+
+def add_text(state: Dict, text: str) -> None:
+    """
+    Add the pseudo-docs (non-empty lines, as in ngram_stats.split_docs) of
+    `text` to the n-gram counts. `text` must start at a line boundary of the
+    text added before it.
+    """
+    analyzer = TfidfVectorizer(**vectorizer_params(state["ngram_range"])).build_analyzer()
+    index = {t: i for i, t in enumerate(state["ngram_terms"])}
+
+    indptr, indices, data = [0], array("i"), array("i")
+    for line in text.splitlines():
+        doc = line.strip()
+        if not doc:
+            continue
+        for t, c in Counter(analyzer(doc)).items():
+            indices.append(index.setdefault(t, len(index)))
+            data.append(c)
+        indptr.append(len(indices))
+
+    new_rows = sp.csr_matrix(
+        (np.frombuffer(data, dtype=np.int32), np.frombuffer(indices, dtype=np.int32), indptr),
+        shape=(len(indptr) - 1, len(index)),
+    )
+    old_rows = state["doc_terms"]
+    old_rows = sp.csr_matrix(
+        (old_rows.data, old_rows.indices, old_rows.indptr),
+        shape=(old_rows.shape[0], len(index)),
+    )
+
+    state["ngram_terms"] = list(index)
+    state["doc_terms"] = sp.vstack([old_rows, new_rows], format="csr")
+    state["head_text"] = state["head_text"] + text if n_docs(state) < 5 else None
+
+
+def ingest(state: Dict, text: str, tokenizer: str = "nltk") -> List[str]:
+    """
+    Add a batch of raw text to the state; returns its preprocessed tokens.
+    With the NLTK tokenizer the batch should start at a sentence boundary
+    (see preprocess.iter_shards) for the counts to equal a full rebuild.
+    """
+    tokens = preprocess_text(text, tokenizer)
+    add_tokens(state, tokens)
+    add_text(state, text)
+    return tokens
+
+
+def merge_states(a: Dict, b: Dict) -> Dict:
+    """
+    State of the text of `a` followed by the text of `b`, e.g. for batches
+    ingested in parallel.
+    """
+    if a["ngram_range"] != b["ngram_range"]:
+        raise ValueError(f"Cannot merge states with ngram_range {a['ngram_range']} and {b['ngram_range']}")
+
+    merged = empty_state(a["ngram_range"])
+
+    index = {t: i for i, t in enumerate(a["unigram_vocab"])}
+    b_ids = np.array([index.setdefault(t, len(index)) for t in b["unigram_vocab"]], dtype=np.int64)
+    counts = np.zeros(len(index), dtype=np.int64)
+    counts[: len(a["unigram_counts"])] = a["unigram_counts"]
+    counts[b_ids] += b["unigram_counts"]
+    merged["unigram_vocab"] = list(index)
+    merged["unigram_counts"] = counts
+
+    term_index = {t: i for i, t in enumerate(a["ngram_terms"])}
+    col_map = np.array(
+        [term_index.setdefault(t, len(term_index)) for t in b["ngram_terms"]], dtype=np.int32
+    )
+    rows_b = b["doc_terms"]
+    rows_b = sp.csr_matrix(
+        (rows_b.data, col_map[rows_b.indices], rows_b.indptr),
+        shape=(rows_b.shape[0], len(term_index)),
+    )
+    rows_a = a["doc_terms"]
+    rows_a = sp.csr_matrix(
+        (rows_a.data, rows_a.indices, rows_a.indptr), shape=(rows_a.shape[0], len(term_index))
+    )
+    merged["ngram_terms"] = list(term_index)
+    merged["doc_terms"] = sp.vstack([rows_a, rows_b], format="csr")
+
+    if n_docs(merged) < 5:
+        merged["head_text"] = a["head_text"] + b["head_text"]
+    else:
+        merged["head_text"] = None
+    return merged
+
+
+def ngram_tfidf(state: Dict, min_df: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregated n-gram TF-IDF of the state, equal to
+    ngram_stats.fit_ngram_tfidf over the pseudo-docs of the ingested text.
+    """
+    if n_docs(state) < 5:
+        return fit_ngram_tfidf([state["head_text"]], state["ngram_range"], min_df)
+
+    # replay CountVectorizer + TfidfTransformer step by step (same entry
+    # order inside each row), so the float sums match bit for bit:
+    # ngram_terms are ids in order of first occurrence, like the vectorizer's
+    # vocabulary before _sort_features
+    rows = state["doc_terms"].astype(np.float64)
+    rows.sort_indices()
+    terms = np.array(state["ngram_terms"], dtype=object)
+    df = np.bincount(rows.indices, minlength=len(terms))
+
+    keep = np.flatnonzero(df >= min_df)
+    if len(keep) == 0:
+        return terms[keep], np.zeros(0)
+    X = rows[:, keep]
+
+    # renumber the kept terms alphabetically, without re-sorting the rows
+    order = np.argsort(terms[keep], kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    X.indices = rank[X.indices].astype(X.indices.dtype)
+    X.has_sorted_indices = False
+
+    idf = _idf(df[keep][order].astype(float), n_docs(state))
+    X.data *= idf[X.indices]
+    X = normalize(X)
+    return terms[keep][order], X.sum(axis=0).A1
+
+
+def save_state(state: Dict, path: str = "data/processed/corpus_state.npz") -> None:
+    rows = state["doc_terms"]
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez(
+        path,
+        ngram_range=np.array(state["ngram_range"]),
+        unigram_vocab=np.array(state["unigram_vocab"], dtype=str),
+        unigram_counts=state["unigram_counts"],
+        ngram_terms=np.array(state["ngram_terms"], dtype=str),
+        data=rows.data,
+        indices=rows.indices,
+        indptr=rows.indptr,
+        head_text=state["head_text"] or "",
+        has_head=state["head_text"] is not None,
+        corpus_digest=state["corpus_digest"] or "",
+    )
+
+
+def load_state(path: str = "data/processed/corpus_state.npz") -> Dict:
+    cached = np.load(path)
+    ngram_terms = cached["ngram_terms"].tolist()
+    return {
+        "ngram_range": tuple(cached["ngram_range"].tolist()),
+        "unigram_vocab": cached["unigram_vocab"].tolist(),
+        "unigram_counts": cached["unigram_counts"],
+        "ngram_terms": ngram_terms,
+        "doc_terms": sp.csr_matrix(
+            (cached["data"], cached["indices"], cached["indptr"]),
+            shape=(len(cached["indptr"]) - 1, len(ngram_terms)),
+        ),
+        "head_text": str(cached["head_text"]) if bool(cached["has_head"]) else None,
+        "corpus_digest": (
+            str(cached["corpus_digest"]) or None if "corpus_digest" in cached.files else None
+        ),
+    }
+
+
+def corpus_digest(corpus_path: str) -> str:
+    h = hashlib.sha256()
+    with open(corpus_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def append_to_corpus(corpus_path: str, text: str) -> str:
+    """
+    Append a batch to the raw corpus, starting it on a new line.
+    Returns the text actually appended.
+    """
+    with open(corpus_path, "rb") as f:
+        size = f.seek(0, 2)
+        if size:
+            f.seek(-1, 2)
+        last = f.read(1)
+    if size and last != b"\n":
+        text = "\n" + text
+    with open(corpus_path, "a", encoding="utf-8") as f:
+        f.write(text)
+    return text
+
+
+def main(batch_path=None, tokenizer="nltk", min_df=2):
+    """
+    Without `batch_path`: build the state from the whole corpus.
+    With `batch_path`: append that file to the corpus and update the state
+    (and the token-id artifact) from the new text only.
+
+    Either way the n-gram TF-IDF artifact is rewritten for the current
+    corpus, so phrases.py and hybrid_rank.py pick it up without refitting.
+    A saved state whose corpus digest does not match the corpus (edited
+    other than through this function) is rebuilt before the batch is added.
+    """
+    corpus_path = "data/raw/economics_sample.txt"
+    state_path = "data/processed/corpus_state.npz"
+    tokens_prefix = "data/processed/processed_tokens"
+    ngram_range = (2, 3)
+
+    state = None
+    if batch_path is not None and Path(state_path).exists():
+        state = load_state(state_path)
+        if state["corpus_digest"] != corpus_digest(corpus_path):
+            print(f"{corpus_path} changed since the corpus state was saved; rebuilding it")
+            state = None
+
+    if state is None:
+        state = empty_state(ngram_range)
+        shards = iter_shards(corpus_path, sentence_aware=tokenizer == "nltk")
+        save_token_ids((ingest(state, shard, tokenizer) for shard in shards), tokens_prefix)
+        print(f"Built corpus state from {corpus_path}")
+
+    if batch_path is not None:
+        with open(batch_path, "r", encoding="utf-8", errors="ignore") as f:
+            text = append_to_corpus(corpus_path, f.read())
+        append_token_ids(ingest(state, text, tokenizer), tokens_prefix)
+        print(f"Appended {batch_path} to {corpus_path}")
+
+    state["corpus_digest"] = corpus_digest(corpus_path)
+
+    save_state(state, state_path)
+
+    terms, scores = ngram_tfidf(state, min_df)
+    save_ngram_tfidf(
+        terms,
+        scores,
+        "data/processed/ngram_tfidf.npz",
+        ngram_fingerprint(corpus_path, ngram_range, min_df),
+        ngram_mode(streaming=False),
+    )
+
+    print(
+        f"Corpus state: {n_docs(state)} docs, {len(state['unigram_vocab'])} tokens, "
+        f"{len(terms)} n-grams (min_df={min_df}) -> {state_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
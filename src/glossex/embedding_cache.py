@@ -0,0 +1,99 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def model_key(model_name: str, config) -> str:
+    """
+    Identify a model by name and revision.
+    Hub models carry the commit hash in their config; for local directories
+    we fall back to a hash of the config and the size/mtime of the files.
+    """
+    revision = getattr(config, "_commit_hash", None)
+    if not revision:
+        h = hashlib.sha256(config.to_json_string().encode("utf-8"))
+        path = Path(model_name)
+        if path.is_dir():
+            for p in sorted(path.iterdir()):
+                st = p.stat()
+                h.update(f"{p.name}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+        revision = h.hexdigest()
+    return f"{model_name}@{revision}"
+
+
+class EmbeddingCache:
+    """
+    On-disk (SQLite) cache of token vectors, content-addressed by
+    (model key, token). When `max_entries` is set, the least recently used
+    entries are evicted once the cache grows past it.
+    """
+
+    def __init__(self, path: str = "data/cache/embeddings.sqlite", max_entries: Optional[int] = None):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+
+    @staticmethod
+    def _key(model: str, token: str) -> str:
+        return hashlib.sha256(f"{model}\0{token}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, tokens: Iterable[str]) -> Dict[str, List[float]]:
+        keys = {self._key(model, t): t for t in tokens}
+        found = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for key, blob in rows:
+                found[keys[key]] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        if found:
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, self._key(model, t)) for t in found],
+            )
+            self.conn.commit()
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[str, List[float]]):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [
+                (self._key(model, t), np.asarray(v, dtype=np.float32).tobytes(), now)
+                for t, v in embeddings.items()
+            ],
+        )
+        self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        if self.max_entries is None:
+            return
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
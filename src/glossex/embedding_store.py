@@ -0,0 +1,105 @@
+import hashlib
+import json
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+class EmbeddingStore(Mapping):
+    """
+    Read-only token -> vector mapping backed by one (n_tokens, dim) matrix.
+    Lookups return row views, so a memory-mapped matrix is never copied.
+    """
+
+    def __init__(self, tokens: List[str], vectors: np.ndarray):
+        self.tokens = tokens
+        self.vectors = vectors
+        self.index = {t: i for i, t in enumerate(tokens)}
+
+    def __getitem__(self, token: str) -> np.ndarray:
+        return self.vectors[self.index[token]]
+
+    def __contains__(self, token) -> bool:
+        return token in self.index
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def rows(self, tokens: Sequence[str]) -> np.ndarray:
+        return np.array([self.index[t] for t in tokens], dtype=np.int64)
+
+
+def _store_paths(path_prefix: str):
+    return Path(f"{path_prefix}.npy"), Path(f"{path_prefix}.tokens.json")
+
+
+def save_embedding_store(
+    embeddings: Dict[str, List[float]], path_prefix: str, dtype: str = "float32"
+):
+    """
+    Write embeddings as `<prefix>.npy` (float32 or float16 matrix) plus
+    `<prefix>.tokens.json` (row order).
+    """
+    tokens = list(embeddings.keys())
+    vectors = np.array([embeddings[t] for t in tokens], dtype=dtype)
+    save_embedding_matrix(tokens, vectors, path_prefix)
+
+
+def save_embedding_matrix(tokens: List[str], vectors: np.ndarray, path_prefix: str):
+    """
+    Write an already stacked (n_tokens, dim) matrix in the store format.
+    """
+    npy_path, tokens_path = _store_paths(path_prefix)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(npy_path, vectors)
+    with open(tokens_path, "w", encoding="utf-8") as f:
+        json.dump(tokens, f)
+
+
+def load_embedding_store(path_prefix: str, mmap: bool = True) -> EmbeddingStore:
+    """
+    Load a store written by save_embedding_store, memory-mapping the matrix.
+    A legacy `<prefix>.json` dump is converted to a store on first use.
+    """
+    npy_path, tokens_path = _store_paths(path_prefix)
+    legacy_path = Path(f"{path_prefix}.json")
+
+    if not npy_path.exists() and legacy_path.exists():
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            save_embedding_store(json.load(f), path_prefix)
+
+    with open(tokens_path, "r", encoding="utf-8") as f:
+        tokens = json.load(f)
+    vectors = np.load(npy_path, mmap_mode="r" if mmap else None)
+
+    return EmbeddingStore(tokens, vectors)
+
+
+def embedding_matrix(embeddings, tokens: Sequence[str]) -> np.ndarray:
+    """
+    Stack the vectors of `tokens`. For a store whose row order already
+    matches, the (possibly memory-mapped) matrix is returned as is.
+    """
+    if isinstance(embeddings, EmbeddingStore):
+        if list(tokens) == embeddings.tokens:
+            return embeddings.vectors
+        return embeddings.vectors[embeddings.rows(tokens)]
+    return np.array([embeddings[t] for t in tokens])
+
+
+def embedding_fingerprint(embeddings) -> str:
+    """
+    Content hash of the token order and the vectors; changes whenever the
+    embeddings are recomputed with different results.
+    """
+    tokens = list(embeddings.keys())
+    vectors = np.ascontiguousarray(embedding_matrix(embeddings, tokens))
+    h = hashlib.sha256(json.dumps(tokens).encode("utf-8"))
+    h.update(str(vectors.dtype).encode("utf-8"))
+    h.update(memoryview(vectors).cast("B"))
+    return h.hexdigest()
@@ -1,51 +1,262 @@
+import hashlib
 import json
-from typing import Dict, List
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
 
+import numpy as np
 import torch
-from transformers import AutoTokenizer, AutoModel
+from transformers import AutoConfig, AutoTokenizer, AutoModel
 from tqdm import tqdm
 
+from .embedding_cache import EmbeddingCache, model_key
+from .embedding_store import save_embedding_store
+from .token_store import load_token_ids
+
+
+def embed_batch(model, tokenizer, input_ids: List[List[int]]) -> torch.Tensor:
+    """
+    Run one forward pass over already tokenized inputs and mean-pool the
+    last hidden state over the non-padding positions.
+    """
+    batch = tokenizer.pad({"input_ids": input_ids}, return_tensors="pt")
+    outputs = model(**batch)
+    mask = batch["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+    summed = (outputs.last_hidden_state * mask).sum(dim=1)
+    return summed / mask.sum(dim=1)
+
+
+def load_model(model_name: str, quantize: bool = False, local_files_only: bool = False):
+    """
+    Load (tokenizer, model) in eval mode. `model_name` may be a local model
+    directory; with `local_files_only` nothing is fetched from the hub.
+
+    With `quantize`, the linear layers get int8 dynamic quantization
+    (weights stored in int8, activations quantized per batch) for faster
+    CPU inference. Vectors then differ slightly from fp32, see
+    scripts/compare_quantization.py.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_files_only)
+    model = AutoModel.from_pretrained(model_name, local_files_only=local_files_only)
+    model.eval()
+
+    if quantize:
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return tokenizer, model
+
 
 def compute_embeddings(
-    tokens: List[str], model_name: str = "distilbert-base-uncased"
+    tokens: List[str],
+    model_name: str = "distilbert-base-uncased",
+    batch_size: int = 64,
+    num_threads: Optional[int] = None,
+    cache: Optional[EmbeddingCache] = None,
+    quantize: bool = False,
+    local_files_only: bool = False,
+    n_workers: int = 1,
+    shard_dir: str = "data/cache/embedding_shards",
+    shard_size: int = 2048,
 ) -> Dict[str, List[float]]:
     """
     Compute contextualized embeddings for each token using BERT.
     Each token is embedded independently (single-token context).
+
+    Unique tokens are sorted by tokenized length and embedded in batches of
+    `batch_size`, so most batches need little or no padding. Padding is
+    masked out of the mean, which keeps the vectors equal (within float
+    tolerance) to embedding every token on its own. `num_threads` sets the
+    torch intra-op thread count.
+
+    With a `cache`, vectors already stored for this model revision are
+    reused and only the misses go through the model. Quantized vectors are
+    cached under their own key. See load_model for `quantize` and
+    `local_files_only`.
+
+    With `n_workers` > 1 the tokens to embed are split into shards of
+    `shard_size` and embedded by that many processes (see embed_sharded),
+    each with an equal share of `num_threads` (default: all cores).
     """
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModel.from_pretrained(model_name)
-    model.eval()
+    if num_threads and n_workers <= 1:
+        torch.set_num_threads(num_threads)
+
+    vocab = sorted(set(tokens))
+    embeddings = {}
+
+    if cache is not None or n_workers > 1:
+        key = model_key(
+            model_name, AutoConfig.from_pretrained(model_name, local_files_only=local_files_only)
+        )
+        if quantize:
+            key += "+int8"
+
+    if cache is not None:
+        embeddings.update(cache.get_many(key, vocab))
+        misses = [t for t in vocab if t not in embeddings]
+    else:
+        misses = vocab
+
+    if misses and n_workers > 1:
+        computed = embed_sharded(
+            misses,
+            model_name,
+            key,
+            batch_size,
+            n_workers,
+            shard_dir,
+            shard_size,
+            num_threads,
+            quantize,
+            local_files_only,
+        )
+    elif misses:
+        computed = embed_tokens(misses, model_name, batch_size, quantize, local_files_only)
+
+    if misses:
+        if cache is not None:
+            cache.put_many(key, computed)
+        embeddings.update(computed)
+
+    return {t: embeddings[t] for t in vocab}
+
+
+def embed_tokens(
+    vocab: List[str],
+    model_name: str,
+    batch_size: int,
+    quantize: bool = False,
+    local_files_only: bool = False,
+) -> Dict[str, List[float]]:
+    """
+    Embed unique tokens in length-bucketed batches.
+    """
+    tokenizer, model = load_model(model_name, quantize, local_files_only)
+    return embed_with_model(vocab, tokenizer, model, batch_size)
+
+
+def embed_with_model(
+    vocab: List[str], tokenizer, model, batch_size: int, progress: bool = True
+) -> Dict[str, List[float]]:
+    encoded = tokenizer(vocab, truncation=True)["input_ids"]
+    # bucket by tokenized length to keep padding small
+    order = sorted(range(len(vocab)), key=lambda i: len(encoded[i]))
 
     embeddings = {}
 
     with torch.no_grad():
-        for token in tqdm(set(tokens), desc="Computing embeddings"):
-            encoded = tokenizer(
-                token,
-                return_tensors="pt",
-                truncation=True,
-                padding=True,
-            )
-            outputs = model(**encoded)
-            vector = outputs.last_hidden_state.mean(dim=1).squeeze().tolist()
-            embeddings[token] = vector
+        for start in tqdm(
+            range(0, len(order), batch_size), desc="Computing embeddings", disable=not progress
+        ):
+            idx = order[start:start + batch_size]
+            vectors = embed_batch(model, tokenizer, [encoded[i] for i in idx])
+            for i, vector in zip(idx, vectors.tolist()):
+                embeddings[vocab[i]] = vector
 
     return embeddings
 
 
-def main():
-    with open("data/processed/processed_tokens.json", "r") as f:
-        tokens = json.load(f)
+# per-process model for embed_sharded workers
+_worker_model = {}
+
 
-    embeddings = compute_embeddings(tokens)
+def _init_shard_worker(model_name, quantize, local_files_only, num_threads):
+    torch.set_num_threads(num_threads)
+    _worker_model["model"] = load_model(model_name, quantize, local_files_only)
+
+
+def _embed_shard(tokens: List[str], path: str, batch_size: int) -> str:
+    tokenizer, model = _worker_model["model"]
+    embeddings = embed_with_model(tokens, tokenizer, model, batch_size, progress=False)
+    vectors = np.array([embeddings[t] for t in tokens], dtype=np.float32)
+
+    # write-then-rename, so a shard file on disk is always complete
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, vectors)
+    os.replace(tmp_path, path)
+    return path
+
+
+def embed_sharded(
+    vocab: List[str],
+    model_name: str,
+    key: str,
+    batch_size: int = 64,
+    n_workers: int = 2,
+    shard_dir: str = "data/cache/embedding_shards",
+    shard_size: int = 2048,
+    num_threads: Optional[int] = None,
+    quantize: bool = False,
+    local_files_only: bool = False,
+) -> Dict[str, List[float]]:
+    """
+    Embed `vocab` across `n_workers` processes. Each worker loads the model
+    once and uses num_threads // n_workers torch threads.
+
+    The vocabulary is cut into fixed shards of `shard_size` tokens, named by
+    a hash of the model `key` and their tokens, and every finished shard is
+    saved under `shard_dir`. The result does not depend on `n_workers`, and
+    if a worker dies, rerunning with the same vocabulary only embeds the
+    missing shards. Shard files are removed once merged.
+    """
+    shards = [vocab[i:i + shard_size] for i in range(0, len(vocab), shard_size)]
+    paths = [
+        Path(shard_dir) / (
+            hashlib.sha256(json.dumps([key, shard]).encode("utf-8")).hexdigest()[:32] + ".npy"
+        )
+        for shard in shards
+    ]
+    todo = [i for i, path in enumerate(paths) if not path.exists()]
+
+    if todo:
+        Path(shard_dir).mkdir(parents=True, exist_ok=True)
+        threads = max(1, (num_threads or os.cpu_count() or 1) // n_workers)
+        with ProcessPoolExecutor(
+            max_workers=min(n_workers, len(todo)),
+            # spawn: forking a process that already runs torch threads can hang
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_shard_worker,
+            initargs=(model_name, quantize, local_files_only, threads),
+        ) as pool:
+            futures = [
+                pool.submit(_embed_shard, shards[i], str(paths[i]), batch_size) for i in todo
+            ]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Embedding shards"):
+                future.result()
+
+    embeddings = {}
+    for shard, path in zip(shards, paths):
+        embeddings.update(zip(shard, np.load(path).tolist()))
+    for path in paths:
+        path.unlink()
+
+    return embeddings
+
+
+def main(
+    model_name="distilbert-base-uncased", quantize=False, local_files_only=False, n_workers=1
+):
+    # the vocabulary file already lists every unique token
+    _, vocab = load_token_ids("data/processed/processed_tokens")
+
+    cache = EmbeddingCache("data/cache/embeddings.sqlite")
+    embeddings = compute_embeddings(
+        vocab,
+        model_name,
+        cache=cache,
+        quantize=quantize,
+        local_files_only=local_files_only,
+        n_workers=n_workers,
+    )
+    cache.close()
 
-    with open("data/processed/lemma_embeddings.json", "w") as f:
-        json.dump(embeddings, f)
+    save_embedding_store(embeddings, "data/processed/lemma_embeddings")
 
     print(
         f"Computed embeddings for {len(embeddings)} tokens "
-        f"and saved to data/processed/lemma_embeddings.json"
+        f"and saved to data/processed/lemma_embeddings.npy"
     )
 
 
@@ -1,6 +1,11 @@
+import hashlib
 import json
 import numpy as np
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .embedding_store import embedding_matrix, load_embedding_store
+from .similarity import cosine_matrix, present_seeds
 
 
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
@@ -12,42 +17,149 @@ def load_seed_list(path: str) -> List[str]:
         return [line.strip() for line in f if line.strip()]
 
 
-def filter_clusters(
+def cluster_seed_means(
     clusters: Dict[str, List[str]],
     embeddings: Dict[str, List[float]],
     econ_seeds: List[str],
     general_seeds: List[str],
-    margin: float = 0.02,          # هرچقدر بزرگ‌تر، سخت‌گیرانه‌تر
-    top_n_clusters: int = 80,       # حداقل این تعداد خوشه را نگه می‌داریم
-) -> Dict[str, List[str]]:
-    scored = []  # (cid, score, tokens)
+    dtype=np.float64,
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], np.ndarray]:
+    """
+    Mean token-seed cosine per cluster, for the econ and general seeds.
+
+    All token-seed cosines come from one matrix multiply per seed list, and
+    the per-cluster means from a grouped (bincount) reduction. Since every
+    token is compared with the same seeds, the mean of the per-token means
+    equals the mean over all (token, seed) pairs.
+    Returns (econ_means, gen_means, sizes) aligned with the cluster order;
+    a mean array is None when none of its seeds has an embedding, and
+    sizes counts the embedded tokens in each cluster. `dtype` is the
+    precision of the cosine computation (float32 for reduced stores).
+    """
+    members, labels = [], []
+    for i, tokens in enumerate(clusters.values()):
+        for token in tokens:
+            if token in embeddings:
+                members.append(token)
+                labels.append(i)
+
+    uniq = list(dict.fromkeys(members))
+    pos = {t: j for j, t in enumerate(uniq)}
+    member_rows = np.array([pos[t] for t in members], dtype=np.int64)
+    labels = np.array(labels, dtype=np.int64)
+    sizes = np.bincount(labels, minlength=len(clusters))
+
+    token_matrix = embedding_matrix(embeddings, uniq)
+
+    def group_mean(seeds):
+        seeds = present_seeds(seeds, embeddings)
+        if not seeds:
+            return None
+        if not uniq:
+            return np.zeros(len(clusters))
+        per_token = cosine_matrix(
+            token_matrix, embedding_matrix(embeddings, seeds), dtype
+        ).mean(axis=1)
+        sums = np.bincount(labels, weights=per_token[member_rows], minlength=len(clusters))
+        return sums / np.maximum(sizes, 1)
+
+    return group_mean(econ_seeds), group_mean(general_seeds), sizes
+
+
+def score_clusters(
+    clusters: Dict[str, List[str]],
+    embeddings: Dict[str, List[float]],
+    econ_seeds: List[str],
+    general_seeds: List[str],
+    dtype=np.float64,
+) -> Dict[str, float]:
+    """
+    econ_mean - gen_mean for every cluster that can be scored.
+    """
+    scores = {}
+
+    econ_means, gen_means, sizes = cluster_seed_means(
+        clusters, embeddings, econ_seeds, general_seeds, dtype
+    )
 
-    for cid, tokens in clusters.items():
-        econ_scores = []
-        gen_scores = []
+    for i, cid in enumerate(clusters.keys()):
+        # اگر یکی از لیست‌ها خالی بود، از این خوشه رد شو
+        if sizes[i] == 0 or econ_means is None or gen_means is None:
+            continue
 
-        for token in tokens:
-            if token not in embeddings:
-                continue
-            v = np.array(embeddings[token])
+        scores[cid] = float(econ_means[i]) - float(gen_means[i])  # هرچی بزرگ‌تر، اقتصادی‌تر
 
-            for s in econ_seeds:
-                if s in embeddings:
-                    econ_scores.append(cosine_similarity(v, np.array(embeddings[s])))
+    return scores
 
-            for s in general_seeds:
-                if s in embeddings:
-                    gen_scores.append(cosine_similarity(v, np.array(embeddings[s])))
 
-        # اگر یکی از لیست‌ها خالی بود، از این خوشه رد شو
-        if not econ_scores or not gen_scores:
-            continue
+def update_cluster_scores(
+    scores: Dict[str, float],
+    clusters: Dict[str, List[str]],
+    embeddings: Dict[str, List[float]],
+    econ_seeds: List[str],
+    general_seeds: List[str],
+    changed,
+    dtype=np.float64,
+) -> Dict[str, float]:
+    """
+    Re-score only the `changed` clusters (and clusters missing from
+    `scores`); every other cluster keeps its previous score.
+    """
+    stale = {
+        cid: tokens for cid, tokens in clusters.items()
+        if cid in changed or cid not in scores
+    }
+    fresh = score_clusters(stale, embeddings, econ_seeds, general_seeds, dtype)
+
+    updated = {}
+    for cid in clusters:
+        if cid in stale:
+            if cid in fresh:
+                updated[cid] = fresh[cid]
+        elif cid in scores:
+            updated[cid] = scores[cid]
+    return updated
+
+
+def seed_fingerprint(econ_seeds: List[str], general_seeds: List[str]) -> str:
+    return hashlib.sha256(json.dumps([econ_seeds, general_seeds]).encode("utf-8")).hexdigest()
+
+
+def vector_digest(embeddings, tokens: List[str]) -> str:
+    """
+    Hash of the embedded `tokens` and their vectors.
+    """
+    tokens = [t for t in tokens if t in embeddings]
+    h = hashlib.sha256(json.dumps(tokens).encode("utf-8"))
+    if tokens:
+        vectors = np.ascontiguousarray(embedding_matrix(embeddings, tokens))
+        h.update(str(vectors.dtype).encode("utf-8"))
+        h.update(memoryview(vectors).cast("B"))
+    return h.hexdigest()
+
+
+def cluster_digests(clusters: Dict[str, List[str]], embeddings) -> Dict[str, str]:
+    return {cid: vector_digest(embeddings, tokens) for cid, tokens in clusters.items()}
 
-        econ_mean = float(np.mean(econ_scores))
-        gen_mean = float(np.mean(gen_scores))
-        score = econ_mean - gen_mean  # هرچی بزرگ‌تر، اقتصادی‌تر
 
-        scored.append((cid, score, tokens))
+def filter_clusters(
+    clusters: Dict[str, List[str]],
+    embeddings: Dict[str, List[float]],
+    econ_seeds: List[str],
+    general_seeds: List[str],
+    margin: float = 0.02,          # هرچقدر بزرگ‌تر، سخت‌گیرانه‌تر
+    top_n_clusters: int = 80,       # حداقل این تعداد خوشه را نگه می‌داریم
+    scores: Optional[Dict[str, float]] = None,
+    dtype=np.float64,
+) -> Dict[str, List[str]]:
+    """
+    Keep economics-related clusters. `scores` can pass precomputed cluster
+    scores (see update_cluster_scores) instead of scoring every cluster.
+    """
+    if scores is None:
+        scores = score_clusters(clusters, embeddings, econ_seeds, general_seeds, dtype)
+
+    scored = [(cid, scores[cid], tokens) for cid, tokens in clusters.items() if cid in scores]
 
     # مرتب‌سازی بر اساس score نزولی
     scored.sort(key=lambda x: x[1], reverse=True)
@@ -68,20 +180,59 @@ def filter_clusters(
 
 
 
-def main():
+def main(
+    incremental=False, embeddings_path="data/processed/lemma_embeddings", dtype="float64"
+):
     with open("data/processed/clusters.json", "r") as f:
         clusters = json.load(f)
 
-    with open("data/processed/lemma_embeddings.json", "r") as f:
-        embeddings = json.load(f)
+    # embeddings_path="data/processed/reduced_embeddings", dtype="float32"
+    # runs on the projected vectors (see projection.py)
+    embeddings = load_embedding_store(embeddings_path)
 
     econ_seeds = load_seed_list("data/seeds/economics.txt")
     general_seeds = load_seed_list("data/seeds/general.txt")
 
+    # cached cluster scores are reused as long as the seed lists and their
+    # vectors are the same; clustering.py records which clusters changed
+    # since the last run, and a cluster whose vectors differ from the ones it
+    # was scored with (embeddings recomputed in place) is re-scored as well
+    scores_path = Path("data/processed/cluster_scores.json")
+    changed_path = Path("data/processed/changed_clusters.json")
+    seeds_key = seed_fingerprint(econ_seeds, general_seeds)
+    source = {
+        "embeddings": embeddings_path,
+        "seed_vectors": vector_digest(embeddings, econ_seeds + general_seeds),
+        "dtype": dtype,
+    }
+    digests = cluster_digests(clusters, embeddings)
+
+    cached = None
+    if incremental and scores_path.exists() and changed_path.exists():
+        with open(scores_path, "r") as f:
+            cached = json.load(f)
+        if cached.get("seeds") != seeds_key or cached.get("source") != source:
+            cached = None
+
+    if cached is not None:
+        with open(changed_path, "r") as f:
+            changed = set(json.load(f))
+        old_digests = cached.get("clusters", {})
+        changed.update(cid for cid, d in digests.items() if old_digests.get(cid) != d)
+        scores = update_cluster_scores(
+            cached["scores"], clusters, embeddings, econ_seeds, general_seeds, changed, dtype
+        )
+    else:
+        scores = score_clusters(clusters, embeddings, econ_seeds, general_seeds, dtype)
+
+    with open(scores_path, "w") as f:
+        json.dump({"seeds": seeds_key, "source": source, "clusters": digests, "scores": scores}, f)
+
     filtered = filter_clusters(
     clusters, embeddings, econ_seeds, general_seeds,
     margin=0.02,
-    top_n_clusters=80
+    top_n_clusters=80,
+    scores=scores,
 )
 
 
@@ -0,0 +1,53 @@
+from importlib.metadata import version
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+from wordfreq import zipf_frequency
+
+
+def wordfreq_version() -> str:
+    return version("wordfreq")
+
+
+def zipf_table(
+    vocab: Sequence[str], path: Optional[str] = None, lang: str = "en"
+) -> np.ndarray:
+    """
+    General-language Zipf frequency of every vocabulary entry, as a float64
+    array aligned with `vocab` (i.e. with the token ids of token_store).
+
+    With `path`, looked-up values are kept in an .npz table and only tokens
+    missing from it are passed to wordfreq. The table is discarded when the
+    installed wordfreq version or the language changes.
+    """
+    known = {}
+    if path is not None and Path(path).exists():
+        cached = np.load(path)
+        if str(cached["wordfreq_version"]) == wordfreq_version() and str(cached["lang"]) == lang:
+            known = dict(zip(cached["tokens"].tolist(), cached["zipf"].tolist()))
+
+    missing = [t for t in dict.fromkeys(vocab) if t not in known]
+    for t in missing:
+        known[t] = zipf_frequency(t, lang)
+
+    if path is not None and missing:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            tokens=np.array(list(known), dtype=str),
+            zipf=np.array(list(known.values()), dtype=float),
+            wordfreq_version=wordfreq_version(),
+            lang=lang,
+        )
+
+    return np.array([known[t] for t in vocab], dtype=float)
+
+
+def general_prob(zipf: np.ndarray) -> np.ndarray:
+    """
+    Convert Zipf frequencies to the probability-like value used by saliency
+    (1e-9 for words wordfreq does not know).
+    """
+    zipf = np.asarray(zipf, dtype=float)
+    return np.where(zipf > 0, 10.0 ** zipf, 1e-9)
@@ -1,35 +1,33 @@
-import json, re, csv
+import json, re
+from contextlib import ExitStack
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .ngram_stats import load_or_fit_ngram_tfidf
+from .ranking import CsvWriter, JsonArrayWriter, JsonlWriter, top_k, write_rows
 
 def norm(s: str) -> str:
     return re.sub(r"\s+", " ", s.strip().lower())
 
-def load_docs(path="data/raw/economics_sample.txt"):
-    txt = open(path, "r", encoding="utf-8", errors="ignore").read()
-    docs = [d.strip() for d in txt.splitlines() if d.strip()]
-    return docs if len(docs) >= 5 else [txt]
-
 def minmax(x):
     x = np.array(x, dtype=float)
     if len(x)==0: return x
     lo, hi = float(x.min()), float(x.max())
     return (x - lo) / (hi - lo + 1e-9)
 
-def main(alpha=0.8):
-    ranked = json.load(open("data/processed/ranked_phrases.json", "r", encoding="utf-8"))
+def tfidf_score_map(vocab, scores):
+    return {norm(vocab[i]): float(scores[i]) for i in range(len(vocab))}
+
+def hybrid_rank(ranked, tfidf_map, alpha=0.8, top_n=None):
+    return list(iter_hybrid_rank(ranked, tfidf_map, alpha, top_n))
+
+def iter_hybrid_rank(ranked, tfidf_map, alpha=0.8, top_n=None):
+    """
+    Hybrid rows, best first, generated one at a time; with `top_n` only the
+    best top_n are selected. Equal scores keep the input order.
+    """
     terms = [norm(r["term"]) for r in ranked]
     emb_scores = np.array([float(r["score"]) for r in ranked], dtype=float)
 
-    docs = load_docs()
-    vec = TfidfVectorizer(lowercase=True, ngram_range=(2,3), min_df=2,
-                          token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z\-]+\b",
-                          stop_words="english")
-    X = vec.fit_transform(docs)
-    vocab = vec.get_feature_names_out()
-    scores = X.sum(axis=0).A1
-    tfidf_map = {norm(vocab[i]): float(scores[i]) for i in range(len(vocab))}
-
     tfidf_scores = np.array([tfidf_map.get(t, 0.0) for t in terms], dtype=float)
 
     # normalize to comparable scale
@@ -38,17 +36,26 @@ def main(alpha=0.8):
 
     hybrid = alpha * tfidf_n + (1 - alpha) * emb_n
 
-    order = np.argsort(-hybrid)
-    out = [{"term": terms[i], "score": float(hybrid[i]), "tfidf": float(tfidf_scores[i]), "emb": float(emb_scores[i])} for i in order]
+    for i in top_k(hybrid, top_n).tolist():
+        yield {"term": terms[i], "score": float(hybrid[i]), "tfidf": float(tfidf_scores[i]), "emb": float(emb_scores[i])}
 
-    json.dump(out, open("data/processed/ranked_hybrid.json", "w", encoding="utf-8"), indent=2)
+def main(alpha=0.8, top_n=None, jsonl_path=None):
+    ranked = json.load(open("data/processed/ranked_phrases.json", "r", encoding="utf-8"))
 
-    # write final_terms.csv used by eval
-    with open("demo/outputs/final_terms.csv", "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=["term","score"])
-        w.writeheader()
-        for r in out:
-            w.writerow({"term": r["term"], "score": r["score"]})
+    # n-gram TF-IDF fitted once and shared with phrases.py
+    vocab, scores = load_or_fit_ngram_tfidf("data/raw/economics_sample.txt")
+    tfidf_map = tfidf_score_map(vocab, scores)
+
+    # ranked_hybrid.json and final_terms.csv (used by eval) in one streaming pass,
+    # plus JSON Lines with jsonl_path
+    with ExitStack() as stack:
+        writers = [
+            stack.enter_context(JsonArrayWriter("data/processed/ranked_hybrid.json")),
+            stack.enter_context(CsvWriter("demo/outputs/final_terms.csv", ["term", "score"])),
+        ]
+        if jsonl_path:
+            writers.append(stack.enter_context(JsonlWriter(jsonl_path)))
+        write_rows(iter_hybrid_rank(ranked, tfidf_map, alpha, top_n), *writers)
 
     print(f"Saved hybrid ranking with alpha={alpha} -> demo/outputs/final_terms.csv")
 
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+
+def load_gold(path):
+    df = pd.read_csv(path)
+    col = df.columns[0]
+    return set(df[col].astype(str).str.strip().str.lower())
+
+
+def prf(correct, ks, n_gold):
+    """
+    Precision, recall and F1 arrays from hit counts, with the zero
+    conventions of evaluation/eval_topk.py's evaluate_at_k.
+    """
+    ks = np.asarray(ks, dtype=float)
+    n_gold = np.asarray(n_gold, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(ks > 0, correct / ks, 0.0)
+        recall = np.where(n_gold > 0, correct / n_gold, 0.0)
+        f1 = np.where(
+            precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0
+        )
+    return precision, recall, f1
@@ -0,0 +1,256 @@
+import hashlib
+import json
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from .ranking import top_k
+from .tokenization import TOKEN_PATTERN, word_ngrams
+
+
+def split_docs(corpus_text: str) -> List[str]:
+    """
+    Split to pseudo-docs (lines) to make TF-IDF meaningful.
+    """
+    docs = [d.strip() for d in corpus_text.splitlines() if d.strip()]
+    return docs if len(docs) >= 5 else [corpus_text]
+
+
+def vectorizer_params(ngram_range: Tuple[int, int] = (2, 3), min_df: int = 2) -> dict:
+    return dict(
+        lowercase=True,
+        ngram_range=tuple(ngram_range),
+        min_df=min_df,
+        token_pattern=TOKEN_PATTERN,
+        stop_words="english",
+    )
+
+
+def fit_ngram_tfidf(
+    docs: List[str],
+    ngram_range: Tuple[int, int] = (2, 3),
+    min_df: int = 2,
+    pretokenized: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fit TF-IDF over n-grams and aggregate it across docs.
+    Returns (terms, scores), with terms in vectorizer (alphabetical) order.
+    With `pretokenized`, docs are token lists from tokenization.tokenize_docs
+    and the text is not tokenized again.
+    """
+    if pretokenized:
+        vec = TfidfVectorizer(
+            analyzer=partial(word_ngrams, ngram_range=tuple(ngram_range)), min_df=min_df
+        )
+    else:
+        vec = TfidfVectorizer(**vectorizer_params(ngram_range, min_df))
+    X = vec.fit_transform(docs)
+    terms = vec.get_feature_names_out()
+    scores = X.sum(axis=0).A1  # aggregate tf-idf across docs
+    return terms, scores
+
+
+def iter_doc_chunks(corpus_path: str, chunk_lines: int = 10000) -> Iterator[List[str]]:
+    """
+    Stream the corpus as lists of at most `chunk_lines` pseudo-docs (the same
+    non-empty, stripped lines split_docs produces).
+    """
+    chunk = []
+    with open(corpus_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            for d in line.splitlines():
+                d = d.strip()
+                if d:
+                    chunk.append(d)
+            if len(chunk) >= chunk_lines:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+    # TfidfTransformer's smoothed idf
+    return np.log((1 + n_docs) / (1 + df)) + 1
+
+
+def stream_ngram_tfidf(
+    corpus_path: str,
+    ngram_range: Tuple[int, int] = (2, 3),
+    min_df: int = 2,
+    chunk_lines: int = 10000,
+    n_features: Optional[int] = None,
+    max_terms: int = 20000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Out-of-core version of fit_ngram_tfidf that reads the corpus in chunks of
+    lines: one pass for document frequencies, one for the aggregated
+    (l2-normalized) TF-IDF mass.
+
+    By default the n-gram vocabulary is exact, so the result matches
+    fit_ngram_tfidf; only the corpus is streamed, and the document-frequency
+    table holds every distinct n-gram, so memory still grows with the
+    vocabulary. With `n_features`, memory stays bounded: the first passes
+    keep document frequency and TF-IDF mass per hash bucket only, the terms
+    of the `max_terms` heaviest buckets become candidates, and two more
+    passes count their exact document frequency (applying `min_df` per
+    term) and their exact TF-IDF mass. At most `max_terms` terms are
+    returned. The per-document l2 norm is taken over the hashed vector, so
+    scores can differ slightly from the exact mode when n-grams of one
+    document collide.
+    """
+    params = vectorizer_params(ngram_range, min_df)
+    analyzer = TfidfVectorizer(**params).build_analyzer()
+
+    n_docs = sum(len(chunk) for chunk in iter_doc_chunks(corpus_path, chunk_lines))
+    if n_docs < 5:
+        # split_docs falls back to a single document; it is small anyway
+        with open(corpus_path, "r", encoding="utf-8", errors="ignore") as f:
+            return fit_ngram_tfidf(split_docs(f.read()), ngram_range, min_df)
+
+    if n_features is None:
+        df = Counter()
+        for chunk in iter_doc_chunks(corpus_path, chunk_lines):
+            for doc in chunk:
+                df.update(set(analyzer(doc)))
+
+        terms = np.array(sorted(t for t, c in df.items() if c >= min_df), dtype=object)
+        idf = _idf(np.array([df[t] for t in terms], dtype=float), n_docs)
+        del df
+        if len(terms) == 0:
+            return terms, np.zeros(0)
+
+        counter = CountVectorizer(
+            **{k: v for k, v in params.items() if k != "min_df"}, vocabulary=list(terms)
+        )
+        scores = np.zeros(len(terms))
+        for chunk in iter_doc_chunks(corpus_path, chunk_lines):
+            X = normalize(counter.transform(chunk).astype(float).multiply(idf).tocsr())
+            scores += X.sum(axis=0).A1
+        return terms, scores
+
+    hasher = FeatureHasher(n_features=n_features, input_type="string", alternate_sign=False)
+
+    df = np.zeros(n_features)
+    for chunk in iter_doc_chunks(corpus_path, chunk_lines):
+        X = hasher.transform(set(analyzer(doc)) for doc in chunk)
+        df += np.bincount(X.indices, minlength=n_features)
+
+    idf = np.where(df >= min_df, _idf(df, n_docs), 0.0)
+
+    mass = np.zeros(n_features)
+    for chunk in iter_doc_chunks(corpus_path, chunk_lines):
+        X = normalize(hasher.transform(analyzer(doc) for doc in chunk).multiply(idf).tocsr())
+        mass += X.sum(axis=0).A1
+
+    # heavy-hitter table: only terms hashing into the heaviest buckets are
+    # counted exactly
+    top = top_k(mass, max_terms)
+    is_top = np.zeros(n_features, dtype=bool)
+    is_top[top[mass[top] > 0]] = True
+    candidate_df = Counter()
+    for chunk in iter_doc_chunks(corpus_path, chunk_lines):
+        doc_terms = [set(analyzer(doc)) for doc in chunk]
+        chunk_terms = list(set().union(*doc_terms))
+        if not chunk_terms:
+            continue
+        buckets = hasher.transform([t] for t in chunk_terms).indices
+        candidates = {t for t, bucket in zip(chunk_terms, buckets) if is_top[bucket]}
+        for terms in doc_terms:
+            candidate_df.update(terms & candidates)
+
+    terms = np.array(sorted(t for t, c in candidate_df.items() if c >= min_df), dtype=object)
+    if len(terms) == 0:
+        return terms, np.zeros(0)
+    term_idf = _idf(np.array([candidate_df[t] for t in terms], dtype=float), n_docs)
+    del candidate_df
+
+    counter = CountVectorizer(
+        **{k: v for k, v in params.items() if k != "min_df"}, vocabulary=list(terms)
+    )
+    scores = np.zeros(len(terms))
+    for chunk in iter_doc_chunks(corpus_path, chunk_lines):
+        hashed = hasher.transform(analyzer(doc) for doc in chunk).multiply(idf).tocsr()
+        norms = np.sqrt(hashed.multiply(hashed).sum(axis=1).A1)
+        X = counter.transform(chunk).astype(float).multiply(term_idf).tocsr()
+        X = X.multiply(1 / np.where(norms > 0, norms, 1)[:, None]).tocsr()
+        scores += X.sum(axis=0).A1
+
+    keep = np.sort(top_k(scores, max_terms))
+    return terms[keep], scores[keep]
+
+
+def ngram_fingerprint(corpus_path: str, ngram_range: Tuple[int, int], min_df: int) -> str:
+    h = hashlib.sha256(
+        json.dumps(vectorizer_params(ngram_range, min_df), sort_keys=True).encode("utf-8")
+    )
+    with open(corpus_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_or_fit_ngram_tfidf(
+    corpus_path: str = "data/raw/economics_sample.txt",
+    artifact_path: str = "data/processed/ngram_tfidf.npz",
+    ngram_range: Tuple[int, int] = (2, 3),
+    min_df: int = 2,
+    streaming: Optional[bool] = None,
+    **stream_params,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregated n-gram TF-IDF scores shared by phrases.py and hybrid_rank.py.
+    The fitted terms and scores are saved to `artifact_path` together with a
+    fingerprint of the corpus and the vectorizer parameters, and refitted
+    only when that fingerprint changes.
+
+    With `streaming=True` the fit goes through
+    stream_ngram_tfidf(**stream_params); `streaming=None` reuses whatever
+    artifact exists for this corpus (fitting in memory if there is none).
+    """
+    fingerprint = ngram_fingerprint(corpus_path, ngram_range, min_df)
+    mode = ngram_mode(streaming, **stream_params)
+
+    if Path(artifact_path).exists():
+        cached = np.load(artifact_path)
+        if str(cached["fingerprint"]) == fingerprint and (
+            streaming is None or str(cached["mode"]) == mode
+        ):
+            return cached["terms"], cached["scores"]
+
+    if streaming:
+        terms, scores = stream_ngram_tfidf(corpus_path, ngram_range, min_df, **stream_params)
+    else:
+        with open(corpus_path, "r", encoding="utf-8", errors="ignore") as f:
+            docs = split_docs(f.read())
+        terms, scores = fit_ngram_tfidf(docs, ngram_range, min_df)
+
+    save_ngram_tfidf(terms, scores, artifact_path, fingerprint, mode)
+    return terms, scores
+
+
+def ngram_mode(streaming: Optional[bool] = False, **stream_params) -> str:
+    return json.dumps({"streaming": bool(streaming), **stream_params}, sort_keys=True)
+
+
+def save_ngram_tfidf(
+    terms: np.ndarray, scores: np.ndarray, artifact_path: str, fingerprint: str, mode: str
+) -> None:
+    """
+    Write the artifact read by load_or_fit_ngram_tfidf. Also used by
+    corpus_state.py, whose results equal the in-memory fit.
+    """
+    Path(artifact_path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez(
+        artifact_path,
+        terms=np.asarray(terms).astype(str),
+        scores=scores,
+        fingerprint=fingerprint,
+        mode=mode,
+    )
@@ -1,7 +1,10 @@
-import json
 import re
-from typing import List, Tuple
-from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from .ngram_stats import fit_ngram_tfidf, load_or_fit_ngram_tfidf, split_docs
+from .ranking import JsonArrayWriter, top_k, write_rows
 
 
 def load_corpus_text(path: str) -> str:
@@ -23,24 +26,17 @@ def extract_phrases_tfidf(
     Extract candidate terms/phrases using TF-IDF over n-grams.
     Returns a list of normalized candidate phrases.
     """
-    # Split to pseudo-docs (lines) to make TF-IDF meaningful
-    docs = [d.strip() for d in corpus_text.splitlines() if d.strip()]
-    if len(docs) < 5:
-        docs = [corpus_text]
-
-    vec = TfidfVectorizer(
-        lowercase=True,
-        ngram_range=ngram_range,
-        min_df=min_df,
-        token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z\-]+\b",
-        stop_words="english",
-    )
-    X = vec.fit_transform(docs)
-    terms = vec.get_feature_names_out()
-    scores = X.sum(axis=0).A1  # aggregate tf-idf across docs
+    terms, scores = fit_ngram_tfidf(split_docs(corpus_text), ngram_range, min_df)
+    return select_candidates(terms, scores, top_n)
+
 
-    # Top N by score
-    idx = scores.argsort()[::-1][:top_n]
+def select_candidates(terms: Sequence[str], scores: np.ndarray, top_n: int = 5000) -> List[str]:
+    """
+    Turn aggregated n-gram TF-IDF scores into the candidate phrase list.
+    """
+    # Top N by score (equal scores in reverse vocabulary order, as the
+    # reversed stable argsort gives them)
+    idx = top_k(scores, top_n, ties="last")
     candidates = [normalize_space(terms[i]) for i in idx]
 
     # Remove too-short / junk
@@ -64,12 +60,21 @@ def extract_phrases_tfidf(
     return out
 
 
-def main():
-    corpus = load_corpus_text("data/raw/economics_sample.txt")
-    candidates = extract_phrases_tfidf(corpus, top_n=5000, ngram_range=(2, 3), min_df=2)
+def main(streaming=False, **stream_params):
+    # the fitted n-gram scores are shared with hybrid_rank.py;
+    # streaming=True reads the corpus in chunks (see stream_ngram_tfidf);
+    # only streaming=True with n_features=... keeps memory bounded
+    terms, scores = load_or_fit_ngram_tfidf(
+        "data/raw/economics_sample.txt",
+        ngram_range=(2, 3),
+        min_df=2,
+        streaming=streaming,
+        **stream_params,
+    )
+    candidates = select_candidates(terms, scores, top_n=5000)
 
-    with open("data/processed/phrase_candidates.json", "w", encoding="utf-8") as f:
-        json.dump(candidates, f, indent=2)
+    with JsonArrayWriter("data/processed/phrase_candidates.json") as f:
+        write_rows(candidates, f)
 
     print(f"Saved {len(candidates)} phrase candidates to data/processed/phrase_candidates.json")
 
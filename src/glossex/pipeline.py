@@ -0,0 +1,339 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .clustering import cluster_embeddings, cut_linkage, ward_linkage
+from .embedding_cache import EmbeddingCache
+from .embedding_store import EmbeddingStore, save_embedding_matrix
+from .embeddings import compute_embeddings
+from .filtering import filter_clusters, load_seed_list as load_filtering_seeds, score_clusters
+from .hybrid_rank import hybrid_rank, tfidf_score_map
+from .ngram_stats import (
+    fit_ngram_tfidf,
+    ngram_fingerprint,
+    ngram_mode,
+    save_ngram_tfidf,
+    split_docs,
+)
+from .phrases import load_corpus_text, select_candidates
+from .preprocess import filter_tokens, preprocess_corpus
+from .rank_phrases import load_seed_list, rank_phrases
+from .ranking import CsvWriter, write_rows
+from .token_store import token_ids, write_token_ids
+from .tokenization import tokenize_docs
+
+# stage -> stages whose results it reads
+STAGE_INPUTS = {
+    "token_stream": [],
+    "tokens": ["token_stream"],
+    "embeddings": ["tokens"],
+    "clusters": ["embeddings"],
+    "cluster_scores": ["clusters", "embeddings"],
+    "final_terms": ["clusters", "cluster_scores"],
+    "ngram_tfidf": ["token_stream"],
+    "phrase_candidates": ["ngram_tfidf"],
+    "ranked_phrases": ["phrase_candidates", "embeddings"],
+    "ranked_hybrid": ["ranked_phrases", "ngram_tfidf"],
+}
+
+
+class GlossaryPipeline:
+    """
+    The glossary pipeline as one in-memory object. Stages hand their results
+    (token ids, an EmbeddingStore, cluster dicts, ranked lists) straight to
+    the next stage instead of writing and re-parsing JSON; the results equal
+    those of running the stage scripts one after another.
+
+    Each stage is computed on first use and kept. After changing a parameter
+    (e.g. `pipe.alpha = 0.5`), call reset() with the stage that reads it so
+    only that stage and the ones after it are recomputed. Nothing is written
+    to disk unless save() is called.
+    """
+
+    def __init__(
+        self,
+        corpus_path: str = "data/raw/economics_sample.txt",
+        econ_seeds: Optional[List[str]] = None,
+        general_seeds: Optional[List[str]] = None,
+        model_name: str = "distilbert-base-uncased",
+        tokenizer: str = "nltk",
+        n_jobs: Optional[int] = None,
+        embedding_cache: Optional[str] = "data/cache/embeddings.sqlite",
+        quantize: bool = False,
+        local_files_only: bool = False,
+        n_workers: int = 1,
+        cluster_method: str = "agglomerative",
+        n_clusters: Optional[int] = None,
+        margin: float = 0.02,
+        top_n_clusters: int = 80,
+        top_n_phrases: int = 5000,
+        alpha: float = 0.8,
+        dtype=np.float64,
+    ):
+        self.corpus_path = corpus_path
+        # None: each stage reads the seed files with its own script's loader
+        self.econ_seeds = econ_seeds
+        self.general_seeds = general_seeds
+        self.model_name = model_name
+        self.tokenizer = tokenizer
+        self.n_jobs = n_jobs
+        self.embedding_cache = embedding_cache
+        self.quantize = quantize
+        self.local_files_only = local_files_only
+        self.n_workers = n_workers
+        self.cluster_method = cluster_method
+        self.n_clusters = n_clusters
+        self.margin = margin
+        self.top_n_clusters = top_n_clusters
+        self.top_n_phrases = top_n_phrases
+        self.alpha = alpha
+        self.dtype = dtype
+
+        self.results = {}
+
+    def reset(self, *stages: str) -> None:
+        """
+        Drop the results of `stages` and of every stage that depends on
+        them; with no arguments, drop everything.
+        """
+        if not stages:
+            self.results.clear()
+            return
+        stale = set(stages)
+        changed = True
+        while changed:
+            changed = False
+            for stage, inputs in STAGE_INPUTS.items():
+                if stage not in stale and stale.intersection(inputs):
+                    stale.add(stage)
+                    changed = True
+        for stage in stale:
+            self.results.pop(stage, None)
+
+    def seeds(self, stage: str) -> Tuple[List[str], List[str]]:
+        """
+        (econ, general) seeds of the "filtering" or "ranking" stages. Lists
+        passed to the constructor are used by both; otherwise the seed files
+        are read as filtering.py (case kept) and rank_phrases.py
+        (lowercased) read them.
+        """
+        load = load_filtering_seeds if stage == "filtering" else load_seed_list
+        return (
+            self.econ_seeds if self.econ_seeds is not None else load("data/seeds/economics.txt"),
+            self.general_seeds if self.general_seeds is not None else load("data/seeds/general.txt"),
+        )
+
+    def _stage(self, name: str, compute):
+        if name not in self.results:
+            self.results[name] = compute()
+        return self.results[name]
+
+    def set_embeddings(self, embeddings) -> None:
+        """
+        Use existing embeddings (a dict or EmbeddingStore) instead of
+        running the model.
+        """
+        self.reset("embeddings")
+        self.results["embeddings"] = embeddings
+
+    def token_stream(self) -> List[List[str]]:
+        """
+        Regex tokens of each pseudo-doc. With tokenizer="regex" the corpus is
+        tokenized only here, and both the unigram and the n-gram stages read
+        this stream.
+        """
+        return self._stage(
+            "token_stream",
+            lambda: tokenize_docs(split_docs(load_corpus_text(self.corpus_path))),
+        )
+
+    def tokens(self) -> Tuple[np.ndarray, List[str]]:
+        """
+        (token ids, vocab), as preprocess.py stores them.
+        """
+        def compute():
+            if self.tokenizer == "regex":
+                # the regex tokenizer never crosses lines, so per-doc tokens
+                # concatenate to preprocess_corpus's output
+                return token_ids(filter_tokens(doc) for doc in self.token_stream())
+            return token_ids(
+                preprocess_corpus(self.corpus_path, self.n_jobs, tokenizer=self.tokenizer)
+            )
+
+        return self._stage("tokens", compute)
+
+    def embeddings(self):
+        def compute():
+            _, vocab = self.tokens()
+            cache = EmbeddingCache(self.embedding_cache) if self.embedding_cache else None
+            embeddings = compute_embeddings(
+                vocab,
+                self.model_name,
+                cache=cache,
+                quantize=self.quantize,
+                local_files_only=self.local_files_only,
+                n_workers=self.n_workers,
+            )
+            if cache is not None:
+                cache.close()
+            # float32, like the store embeddings.py writes
+            tokens = list(embeddings)
+            return EmbeddingStore(
+                tokens, np.array([embeddings[t] for t in tokens], dtype=np.float32)
+            )
+
+        return self._stage("embeddings", compute)
+
+    def clusters(self) -> Dict[str, List[str]]:
+        def compute():
+            embeddings = self.embeddings()
+            n_clusters = self.n_clusters or max(2, len(embeddings) // 4)
+            if self.cluster_method == "agglomerative":
+                clusters = cut_linkage(list(embeddings.keys()), ward_linkage(embeddings), n_clusters)
+            else:
+                clusters = cluster_embeddings(embeddings, n_clusters, method=self.cluster_method)
+            # string ids, as clusters.json has them
+            return {str(cid): tokens for cid, tokens in clusters.items()}
+
+        return self._stage("clusters", compute)
+
+    def cluster_scores(self) -> Dict[str, float]:
+        return self._stage(
+            "cluster_scores",
+            lambda: score_clusters(
+                self.clusters(), self.embeddings(), *self.seeds("filtering"), self.dtype
+            ),
+        )
+
+    def final_terms(self) -> Dict[str, List[str]]:
+        """
+        Economics-related clusters (final_terms.json).
+        """
+        return self._stage(
+            "final_terms",
+            lambda: filter_clusters(
+                self.clusters(),
+                self.embeddings(),
+                *self.seeds("filtering"),
+                margin=self.margin,
+                top_n_clusters=self.top_n_clusters,
+                scores=self.cluster_scores(),
+                dtype=self.dtype,
+            ),
+        )
+
+    def ngram_tfidf(self) -> Tuple[np.ndarray, np.ndarray]:
+        def compute():
+            if self.tokenizer == "regex":
+                return fit_ngram_tfidf(self.token_stream(), (2, 3), 2, pretokenized=True)
+            return fit_ngram_tfidf(split_docs(load_corpus_text(self.corpus_path)), (2, 3), 2)
+
+        return self._stage("ngram_tfidf", compute)
+
+    def phrase_candidates(self) -> List[str]:
+        return self._stage(
+            "phrase_candidates",
+            lambda: select_candidates(*self.ngram_tfidf(), top_n=self.top_n_phrases),
+        )
+
+    def ranked_phrases(self) -> List[dict]:
+        return self._stage(
+            "ranked_phrases",
+            lambda: rank_phrases(
+                self.phrase_candidates(),
+                self.embeddings(),
+                *self.seeds("ranking"),
+                dtype=self.dtype,
+            ),
+        )
+
+    def ranked_hybrid(self) -> List[dict]:
+        return self._stage(
+            "ranked_hybrid",
+            lambda: hybrid_rank(
+                self.ranked_phrases(), tfidf_score_map(*self.ngram_tfidf()), self.alpha
+            ),
+        )
+
+    def run(self) -> List[dict]:
+        """
+        Compute every stage; returns the hybrid ranking (final_terms.csv).
+        """
+        self.final_terms()
+        return self.ranked_hybrid()
+
+    def save(
+        self,
+        processed_dir: str = "data/processed",
+        final_csv: Optional[str] = "demo/outputs/final_terms.csv",
+    ) -> List[str]:
+        """
+        Write the artifacts of the stages computed so far under the names
+        the stage scripts use. Returns the written paths.
+        """
+        out = Path(processed_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        written = []
+
+        def dump(name, obj, indent=2):
+            with open(out / name, "w", encoding="utf-8") as f:
+                json.dump(obj, f, indent=indent)
+            written.append(str(out / name))
+
+        r = self.results
+        if "tokens" in r:
+            write_token_ids(*r["tokens"], str(out / "processed_tokens"))
+            written.append(str(out / "processed_tokens.npy"))
+        if "embeddings" in r:
+            store = r["embeddings"]
+            tokens = list(store.keys())
+            vectors = (
+                store.vectors if isinstance(store, EmbeddingStore)
+                else np.array([store[t] for t in tokens], dtype=np.float32)
+            )
+            save_embedding_matrix(tokens, vectors, str(out / "lemma_embeddings"))
+            written.append(str(out / "lemma_embeddings.npy"))
+        if "clusters" in r:
+            dump("clusters.json", r["clusters"])
+            dump("changed_clusters.json", list(r["clusters"]), indent=None)
+        if "final_terms" in r:
+            dump("final_terms.json", r["final_terms"])
+        if "ngram_tfidf" in r:
+            terms, scores = r["ngram_tfidf"]
+            path = str(out / "ngram_tfidf.npz")
+            save_ngram_tfidf(
+                terms, scores, path, ngram_fingerprint(self.corpus_path, (2, 3), 2), ngram_mode(False)
+            )
+            written.append(path)
+        if "phrase_candidates" in r:
+            dump("phrase_candidates.json", r["phrase_candidates"])
+        if "ranked_phrases" in r:
+            dump("ranked_phrases.json", r["ranked_phrases"])
+        if "ranked_hybrid" in r:
+            dump("ranked_hybrid.json", r["ranked_hybrid"])
+            if final_csv:
+                with CsvWriter(final_csv, ["term", "score"]) as f:
+                    write_rows(r["ranked_hybrid"], f)
+                written.append(final_csv)
+
+        return written
+
+
+def main(save=True, **params):
+    pipe = GlossaryPipeline(**params)
+    out = pipe.run()
+
+    print(f"{len(pipe.final_terms())} clusters selected, {len(out)} phrases ranked.")
+    print("Top 10:")
+    for row in out[:10]:
+        print(row["term"], "score=", round(row["score"], 4))
+
+    if save:
+        written = pipe.save()
+        print(f"Saved {len(written)} artifacts to data/processed and demo/outputs")
+
+
+if __name__ == "__main__":
+    main()
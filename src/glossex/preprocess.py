@@ -1,44 +1,144 @@
-import json
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterator, List, Optional
 
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from nltk.tokenize import sent_tokenize, word_tokenize
+
+from .token_store import save_token_ids
+from .tokenization import regex_tokenize
 
 # Download required NLTK resources (first run only)
-for pkg in ["punkt_tab", "punkt", "stopwords"]:
-    nltk.download(pkg, quiet=True)
+for pkg, resource in [
+    ("punkt_tab", "tokenizers/punkt_tab"),
+    ("punkt", "tokenizers/punkt"),
+    ("stopwords", "corpora/stopwords"),
+]:
+    try:
+        nltk.data.find(resource)
+    except LookupError:
+        nltk.download(pkg, quiet=True)
+
+
+@lru_cache(maxsize=None)
+def english_stopwords() -> frozenset:
+    return frozenset(stopwords.words("english"))
 
 
-def preprocess_text(text: str):
+def preprocess_text(text: str, tokenizer: str = "nltk"):
     """
     Tokenize text, lowercase tokens, and remove stopwords and non-alphabetic tokens.
+
+    tokenizer="regex" uses the compiled TF-IDF token pattern instead of NLTK's
+    word_tokenize; it is much faster and yields the same stream the n-gram
+    stages see (see scripts/test_tokenizers.py for the differences).
     """
-    tokens = word_tokenize(text)
+    if tokenizer == "nltk":
+        tokens = word_tokenize(text)
+    elif tokenizer == "regex":
+        tokens = regex_tokenize(text)
+    else:
+        raise ValueError(f"Unknown tokenizer: {tokenizer} (expected 'nltk' or 'regex')")
+
+    return filter_tokens(tokens)
+
+
+def filter_tokens(tokens: List[str]) -> List[str]:
     tokens = [t.lower() for t in tokens if t.isalpha()]
 
-    stop_words = set(stopwords.words("english"))
+    stop_words = english_stopwords()
     tokens = [t for t in tokens if t not in stop_words]
 
     return tokens
 
 
-def main():
-    input_path = Path("data/raw/economics_sample.txt")
-    output_path = Path("data/processed/processed_tokens.json")
+def is_sentence_boundary(prev_line: str, next_line: str) -> bool:
+    """
+    True if Punkt ends a sentence between the two lines. Punkt decides a
+    break from the tokens around it only, so this local check tells whether
+    the text can be split here without changing word_tokenize's output.
+    """
+    joined = sent_tokenize(prev_line + "\n" + next_line)
+    return joined == sent_tokenize(prev_line) + sent_tokenize(next_line)
+
+
+def iter_shards(
+    path: str, lines_per_shard: int = 2000, sentence_aware: bool = True
+) -> Iterator[str]:
+    """
+    Stream the corpus as consecutive line ranges of about `lines_per_shard`
+    lines. A shard is only closed at a sentence boundary, so tokenizing the
+    shards one by one gives the same tokens as tokenizing the whole file.
+    The regex tokenizer never looks across lines, so it does not need the
+    sentence check (`sentence_aware=False`).
+    """
+    shard: List[str] = []
+    last = ""  # last non-empty line read so far
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if (
+                len(shard) >= lines_per_shard
+                and line.strip()
+                and last
+                and (not sentence_aware or is_sentence_boundary(last, line))
+            ):
+                yield "".join(shard)
+                shard = []
+            shard.append(line)
+            if line.strip():
+                last = line
+    if shard:
+        yield "".join(shard)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(input_path, "r", encoding="utf-8") as f:
-        text = f.read()
+def _init_worker():
+    # load the stopword list (and Punkt, on first use) once per worker
+    english_stopwords()
 
-    tokens = preprocess_text(text)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(tokens, f, indent=2)
+def preprocess_corpus(
+    path: str,
+    n_jobs: Optional[int] = None,
+    lines_per_shard: int = 2000,
+    tokenizer: str = "nltk",
+) -> Iterator[List[str]]:
+    """
+    Preprocess a corpus file shard by shard across a process pool, yielding
+    each shard's tokens in corpus order. Concatenated, the output is
+    identical to preprocess_text over the whole file.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    shards = iter_shards(path, lines_per_shard, sentence_aware=tokenizer == "nltk")
+
+    if n_jobs == 1:
+        for shard in shards:
+            yield preprocess_text(shard, tokenizer)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker) as pool:
+        # keep a bounded number of shards in flight so memory stays flat
+        pending = deque()
+        for shard in shards:
+            pending.append(pool.submit(preprocess_text, shard, tokenizer))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main(n_jobs=None, tokenizer="nltk"):
+    input_path = Path("data/raw/economics_sample.txt")
+    output_prefix = "data/processed/processed_tokens"
+
+    shards = preprocess_corpus(str(input_path), n_jobs, tokenizer=tokenizer)
+    n_tokens = save_token_ids(shards, output_prefix)
 
-    print(f"Preprocessing completed. {len(tokens)} tokens saved to {output_path}")
+    print(f"Preprocessing completed. {n_tokens} tokens saved to {output_prefix}.npy")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .embedding_store import (
+    EmbeddingStore,
+    embedding_fingerprint,
+    embedding_matrix,
+    load_embedding_store,
+    save_embedding_matrix,
+)
+
+PROJECTION_METHODS = ("pca", "random")
+
+
+def fit_projection(
+    vectors: np.ndarray,
+    n_components: int,
+    method: str = "pca",
+    random_state: int = 0,
+    chunk_size: int = 8192,
+) -> np.ndarray:
+    """
+    Fit a linear projection; returns the (n_components, dim) matrix.
+
+    method:
+      - "pca": top principal axes of the uncentered vectors (eigenvectors of
+        X^T X, accumulated chunk by chunk), which best preserve the dot
+        products the cosine scores are built from
+      - "random": Gaussian random projection (Johnson-Lindenstrauss), no fit
+    """
+    dim = vectors.shape[1]
+    n_components = min(n_components, dim)
+
+    if method == "pca":
+        gram = np.zeros((dim, dim))
+        for start in range(0, len(vectors), chunk_size):
+            chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float64)
+            gram += chunk.T @ chunk
+        eigvals, eigvecs = np.linalg.eigh(gram)
+        components = eigvecs[:, np.argsort(-eigvals, kind="stable")[:n_components]].T
+        # fix the sign of each axis so refits give the same projection
+        signs = np.sign(components[np.arange(n_components), np.abs(components).argmax(axis=1)])
+        return components * signs[:, None]
+
+    if method == "random":
+        rng = np.random.default_rng(random_state)
+        return rng.normal(0.0, 1.0 / np.sqrt(n_components), size=(n_components, dim))
+
+    raise ValueError(f"Unknown projection method: {method} (expected one of {PROJECTION_METHODS})")
+
+
+def project(
+    vectors: np.ndarray, components: np.ndarray, dtype: str = "float32", chunk_size: int = 8192
+) -> np.ndarray:
+    out = np.empty((len(vectors), len(components)), dtype=dtype)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float64)
+        out[start:start + chunk_size] = chunk @ components.T
+    return out
+
+
+def load_or_fit_projection(
+    embeddings,
+    path: str = "data/processed/projection.npz",
+    n_components: int = 128,
+    method: str = "pca",
+    random_state: int = 0,
+) -> np.ndarray:
+    """
+    Projection fitted once and kept at `path`, refitted only when the
+    source embeddings (fingerprint) or the parameters change.
+    """
+    params = json.dumps(
+        {"n_components": n_components, "method": method, "random_state": random_state},
+        sort_keys=True,
+    )
+    fingerprint = embedding_fingerprint(embeddings)
+
+    if Path(path).exists():
+        cached = np.load(path)
+        if str(cached["fingerprint"]) == fingerprint and str(cached["params"]) == params:
+            return cached["components"]
+
+    tokens = list(embeddings.keys())
+    components = fit_projection(
+        embedding_matrix(embeddings, tokens), n_components, method, random_state
+    )
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, components=components, fingerprint=fingerprint, params=params)
+    return components
+
+
+def reduce_embeddings(
+    embeddings, components: np.ndarray, dtype: str = "float32"
+) -> EmbeddingStore:
+    tokens = list(embeddings.keys())
+    return EmbeddingStore(tokens, project(embedding_matrix(embeddings, tokens), components, dtype))
+
+
+def main(n_components=128, method="pca", dtype="float32"):
+    embeddings = load_embedding_store("data/processed/lemma_embeddings")
+
+    components = load_or_fit_projection(
+        embeddings, "data/processed/projection.npz", n_components, method
+    )
+    reduced = reduce_embeddings(embeddings, components, dtype)
+    save_embedding_matrix(reduced.tokens, reduced.vectors, "data/processed/reduced_embeddings")
+
+    print(
+        f"Projected {len(reduced)} embeddings to {reduced.vectors.shape[1]}-d {dtype} "
+        f"({method}) -> data/processed/reduced_embeddings.npy"
+    )
+
+
+if __name__ == "__main__":
+    main()
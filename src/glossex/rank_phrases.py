@@ -1,7 +1,15 @@
 import json
 import re
 import numpy as np
-from typing import List
+from contextlib import ExitStack
+from itertools import chain, islice
+from scipy import sparse
+from typing import Iterator, List, Optional, Set, Tuple
+
+from .ann_index import expand_seed_lists, load_or_build_index, terms_near
+from .embedding_store import embedding_matrix, load_embedding_store
+from .ranking import JsonArrayWriter, JsonlWriter, top_k, write_rows
+from .similarity import cosine_matrix, present_seeds
 
 
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
@@ -26,19 +34,12 @@ def mean_seed_sim(vec: np.ndarray, seeds: List[str], embeds: dict) -> float:
     return float(np.mean(sims)) if sims else 0.0
 
 
-def main():
-    # token embeddings from your existing pipeline
-    with open("data/processed/lemma_embeddings.json", "r", encoding="utf-8") as f:
-        token_embeds = json.load(f)
-
-    # phrase candidates from TF-IDF n-grams
-    with open("data/processed/phrase_candidates.json", "r", encoding="utf-8") as f:
-        phrases = json.load(f)
-
-    econ_seeds = load_seed_list("data/seeds/economics.txt")
-    general_seeds = load_seed_list("data/seeds/general.txt")
-
-    ranked = []
+def select_phrases(phrases: List[str], token_embeds) -> List[Tuple[str, List[str]]]:
+    """
+    Normalize and filter candidate phrases, returning (phrase, words with an
+    embedding) for the ones that survive.
+    """
+    selected = []
     for ph in phrases:
         ph = normalize_space(ph)
         # drop phrases containing very short tokens
@@ -52,24 +53,187 @@ def main():
         if not parts:
             continue
 
-        v = np.mean([np.array(token_embeds[p], dtype=float) for p in parts], axis=0)
+        selected.append((ph, parts))
+    return selected
+
+
+def prefilter_phrases(phrases: List[str], near: Set[str]) -> List[str]:
+    """
+    Candidates with at least one word in `near` (e.g. the nearest
+    neighbours of the econ seeds, see ann_index.terms_near).
+    """
+    return [ph for ph in phrases if any(w in near for w in normalize_space(ph).split())]
+
+
+def phrase_matrix(parts_list: List[List[str]], token_embeds, dtype=np.float64) -> np.ndarray:
+    """
+    Mean word vector of every phrase, as one sparse (phrase x token)
+    count matrix times the embedding rows it touches, in `dtype`.
+    """
+    columns = {}
+    rows, cols = [], []
+    for i, parts in enumerate(parts_list):
+        for p in parts:
+            rows.append(i)
+            cols.append(columns.setdefault(p, len(columns)))
+
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=dtype), (rows, cols)), shape=(len(parts_list), len(columns))
+    )
+    vectors = np.asarray(embedding_matrix(token_embeds, list(columns)), dtype=dtype)
+    lengths = np.array([len(parts) for parts in parts_list], dtype=dtype)
+    return (counts @ vectors) / lengths[:, None]
+
+
+def contextual_phrase_matrix(
+    selected: List[Tuple[str, List[str]]], token_embeds, phrase_embeds, dtype=np.float64
+) -> np.ndarray:
+    """
+    Phrase vectors pooled from the phrases' own corpus contexts (see
+    contextual.py); phrases without one fall back to the mean word vector.
+    """
+    vectors = phrase_matrix([parts for _, parts in selected], token_embeds, dtype)
+    found = [i for i, (ph, _) in enumerate(selected) if ph in phrase_embeds]
+    if found:
+        vectors[found] = embedding_matrix(phrase_embeds, [selected[i][0] for i in found])
+    return vectors
+
+
+def score_phrases(
+    parts_list: List[List[str]],
+    token_embeds,
+    econ_seeds: List[str],
+    general_seeds: List[str],
+    vectors: Optional[np.ndarray] = None,
+    dtype=np.float64,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Batched equivalent of mean_seed_sim for every phrase at once.
+    Returns (score, econ, gen) arrays aligned with `parts_list`.
+    `vectors` overrides the mean-word phrase vectors (phrase_matrix).
+    `dtype` is the compute precision (float32 for reduced stores).
+    """
+    if not parts_list:
+        empty = np.zeros(0)
+        return empty, empty, empty
+
+    if vectors is None:
+        vectors = phrase_matrix(parts_list, token_embeds, dtype)
+
+    def seed_mean(seeds):
+        seeds = present_seeds(seeds, token_embeds)
+        if not seeds:
+            return np.zeros(len(parts_list))
+        return cosine_matrix(vectors, embedding_matrix(token_embeds, seeds), dtype).mean(axis=1)
+
+    econ = seed_mean(econ_seeds)
+    gen = seed_mean(general_seeds)
+    return econ - gen, econ, gen  # economic-ness score
+
+
+def rank_phrases(
+    phrases: List[str],
+    token_embeds,
+    econ_seeds: List[str],
+    general_seeds: List[str],
+    phrase_embeds=None,
+    dtype=np.float64,
+    top_n: Optional[int] = None,
+) -> List[dict]:
+    return list(iter_ranked_phrases(
+        phrases, token_embeds, econ_seeds, general_seeds, phrase_embeds, dtype, top_n
+    ))
+
+
+def iter_ranked_phrases(
+    phrases: List[str],
+    token_embeds,
+    econ_seeds: List[str],
+    general_seeds: List[str],
+    phrase_embeds=None,
+    dtype=np.float64,
+    top_n: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Ranked phrase rows, best first, generated one at a time. With `top_n`
+    only the best top_n are selected (see ranking.top_k); equal scores keep
+    candidate order either way.
+    """
+    selected = select_phrases(phrases, token_embeds)
+    vectors = None
+    if phrase_embeds is not None and selected:
+        vectors = contextual_phrase_matrix(selected, token_embeds, phrase_embeds, dtype)
+    score, econ, gen = score_phrases(
+        [parts for _, parts in selected], token_embeds, econ_seeds, general_seeds, vectors, dtype
+    )
+
+    for i in top_k(score, top_n).tolist():
+        yield {
+            "term": selected[i][0],
+            "score": float(score[i]),
+            "econ": float(econ[i]),
+            "gen": float(gen[i]),
+        }
+
+
+def main(
+    contextual=False,
+    embeddings_path="data/processed/lemma_embeddings",
+    dtype="float64",
+    top_n=None,
+    expand_k=0,
+    prefilter_k=None,
+    jsonl_path=None,
+):
+    if contextual:
+        # sentence-context vectors for tokens and phrases (contextual.py)
+        embeddings_path = "data/processed/contextual_embeddings"
+        token_embeds = load_embedding_store(embeddings_path)
+        phrase_embeds = load_embedding_store("data/processed/phrase_embeddings")
+    else:
+        # token embeddings from your existing pipeline;
+        # embeddings_path="data/processed/reduced_embeddings", dtype="float32"
+        # scores with the projected vectors (see projection.py)
+        token_embeds = load_embedding_store(embeddings_path)
+        phrase_embeds = None
 
-        econ = mean_seed_sim(v, econ_seeds, token_embeds)
-        gen = mean_seed_sim(v, general_seeds, token_embeds)
-        score = econ - gen  # economic-ness score
-
-        ranked.append((ph, score, econ, gen))
-
-    ranked.sort(key=lambda x: x[1], reverse=True)
-
-    out = [{"term": t, "score": s, "econ": e, "gen": g} for (t, s, e, g) in ranked]
+    # phrase candidates from TF-IDF n-grams
+    with open("data/processed/phrase_candidates.json", "r", encoding="utf-8") as f:
+        phrases = json.load(f)
 
-    with open("data/processed/ranked_phrases.json", "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
+    econ_seeds = load_seed_list("data/seeds/economics.txt")
+    general_seeds = load_seed_list("data/seeds/general.txt")
 
-    print(f"Ranked {len(out)} phrases -> data/processed/ranked_phrases.json")
+    if expand_k or prefilter_k:
+        # nearest-neighbour index over the token vectors (ann_index.py)
+        index = load_or_build_index(token_embeds, f"{embeddings_path}.ann.npz")
+        if expand_k:
+            # add the expand_k nearest terms of every seed to its list
+            econ_seeds, general_seeds = expand_seed_lists(
+                index, econ_seeds, general_seeds, expand_k
+            )
+        if prefilter_k:
+            # only score phrases with a word among the econ seeds' neighbours
+            n_candidates = len(phrases)
+            phrases = prefilter_phrases(phrases, terms_near(index, econ_seeds, prefilter_k))
+            print(f"Prefilter kept {len(phrases)} of {n_candidates} candidates")
+
+    rows = iter_ranked_phrases(
+        phrases, token_embeds, econ_seeds, general_seeds, phrase_embeds, dtype, top_n
+    )
+    head = list(islice(rows, 10))
+
+    # rows are streamed to disk, the full ranking is never held as a list;
+    # jsonl_path also writes them as JSON Lines
+    with ExitStack() as stack:
+        writers = [stack.enter_context(JsonArrayWriter("data/processed/ranked_phrases.json"))]
+        if jsonl_path:
+            writers.append(stack.enter_context(JsonlWriter(jsonl_path)))
+        n = write_rows(chain(head, rows), *writers)
+
+    print(f"Ranked {n} phrases -> data/processed/ranked_phrases.json")
     print("Top 10:")
-    for row in out[:10]:
+    for row in head:
         print(row["term"], "score=", round(row["score"], 4))
 
 
@@ -0,0 +1,127 @@
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+def top_k(scores: np.ndarray, k: Optional[int] = None, ties: str = "first") -> np.ndarray:
+    """
+    Indices of the `k` highest scores, best first (all of them if k is None).
+
+    Equal scores keep index order (ties="first", like a stable descending
+    sort) or reverse index order (ties="last", like a stable ascending
+    argsort reversed). The result equals the first k entries of that full
+    sort; when k is smaller than the input, argpartition finds the k-th
+    score and only the entries at or above it are sorted.
+    """
+    scores = np.asarray(scores)
+    n = len(scores)
+    if ties not in ("first", "last"):
+        raise ValueError(f"Unknown tie rule: {ties} (expected 'first' or 'last')")
+
+    if k is None or k >= n:
+        candidates = np.arange(n)
+    elif k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    else:
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        # every entry tied with the k-th score competes for the last places
+        candidates = np.flatnonzero(scores >= kth)
+
+    if ties == "last":
+        candidates = candidates[::-1]
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order[:k] if k is not None else order
+
+
+class _FileWriter:
+    """
+    Rows go to `<path>.tmp`, which replaces `path` only when the writer is
+    closed normally. Leaving a `with` block on an exception removes the
+    temporary file instead, so a failed run never leaves a truncated file
+    that looks complete (an earlier complete file stays in place).
+    """
+
+    def __init__(self, path: str, newline: Optional[str] = None):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.f = open(self.tmp_path, "w", newline=newline, encoding="utf-8")
+        self.count = 0
+
+    def close(self) -> None:
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class JsonArrayWriter(_FileWriter):
+    """
+    Write a JSON array one element at a time. The file is byte-identical
+    to json.dump(list(rows), f, indent=2), without holding the list.
+    """
+
+    def write(self, row) -> None:
+        self.f.write("[\n  " if self.count == 0 else ",\n  ")
+        # one level deeper than a top-level dump
+        self.f.write(json.dumps(row, indent=2).replace("\n", "\n  "))
+        self.count += 1
+
+    def close(self) -> None:
+        self.f.write("\n]" if self.count else "[]")
+        super().close()
+
+
+class JsonlWriter(_FileWriter):
+    """
+    One JSON object per line.
+    """
+
+    def write(self, row) -> None:
+        self.f.write(json.dumps(row))
+        self.f.write("\n")
+        self.count += 1
+
+
+class CsvWriter(_FileWriter):
+    """
+    CSV with a header row; keys of a row that are not in `fieldnames` are
+    ignored, so ranked rows can be written as (term, score) directly.
+    """
+
+    def __init__(self, path: str, fieldnames: List[str]):
+        super().__init__(path, newline="")
+        self.writer = csv.DictWriter(self.f, fieldnames=fieldnames, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, row: dict) -> None:
+        self.writer.writerow(row)
+        self.count += 1
+
+
+def write_rows(rows: Iterable, *writers) -> int:
+    """
+    Stream `rows` into every writer in one pass; returns the row count.
+    """
+    n = 0
+    for row in rows:
+        for writer in writers:
+            writer.write(row)
+        n += 1
+    return n
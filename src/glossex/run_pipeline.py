@@ -0,0 +1,266 @@
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# top-level packages whose modules count as stage code
+PROJECT_PACKAGES = ("src", "scripts")
+
+RAW_CORPUS = "data/raw/economics_sample.txt"
+ECON_SEEDS = "data/seeds/economics.txt"
+GENERAL_SEEDS = "data/seeds/general.txt"
+TOKENS = ["data/processed/processed_tokens.npy", "data/processed/processed_tokens.vocab.json"]
+EMBEDDINGS = ["data/processed/lemma_embeddings.npy", "data/processed/lemma_embeddings.tokens.json"]
+
+
+class Stage:
+    """
+    One pipeline step: `module`.main(**params) reads `inputs` and writes
+    `outputs` (paths relative to the project root). Dependencies between
+    stages follow from which stage declares a path as its output.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        module: str,
+        inputs: List[str],
+        outputs: List[str],
+        params: Optional[dict] = None,
+    ):
+        self.name = name
+        self.module = module
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+
+
+STAGES = [
+    Stage("preprocess", "src.glossex.preprocess", [RAW_CORPUS], TOKENS, {"tokenizer": "nltk"}),
+    # only the vocabulary matters to the embeddings
+    Stage("embeddings", "src.glossex.embeddings", [TOKENS[1]], EMBEDDINGS),
+    Stage(
+        "clustering",
+        "src.glossex.clustering",
+        EMBEDDINGS,
+        ["data/processed/clusters.json", "data/processed/changed_clusters.json"],
+        {"method": "agglomerative"},
+    ),
+    Stage(
+        "filtering",
+        "src.glossex.filtering",
+        ["data/processed/clusters.json", *EMBEDDINGS, ECON_SEEDS, GENERAL_SEEDS],
+        ["data/processed/final_terms.json", "data/processed/cluster_scores.json"],
+    ),
+    Stage(
+        "phrases",
+        "src.glossex.phrases",
+        [RAW_CORPUS],
+        ["data/processed/phrase_candidates.json", "data/processed/ngram_tfidf.npz"],
+    ),
+    Stage(
+        "rank_phrases",
+        "src.glossex.rank_phrases",
+        [*EMBEDDINGS, "data/processed/phrase_candidates.json", ECON_SEEDS, GENERAL_SEEDS],
+        ["data/processed/ranked_phrases.json"],
+    ),
+    Stage(
+        "hybrid_rank",
+        "src.glossex.hybrid_rank",
+        ["data/processed/ranked_phrases.json", "data/processed/ngram_tfidf.npz", RAW_CORPUS],
+        ["data/processed/ranked_hybrid.json", "demo/outputs/final_terms.csv"],
+        {"alpha": 0.8},
+    ),
+    Stage(
+        "tfidf_baseline",
+        "scripts.save_baseline_outputs",
+        TOKENS,
+        ["demo/outputs/tfidf_baseline_top_terms.csv"],
+    ),
+]
+
+
+def stage_dependencies(stages: List[Stage]) -> Dict[str, set]:
+    producers = {}
+    for stage in stages:
+        for out in stage.outputs:
+            if out in producers:
+                raise ValueError(f"{out} is an output of both {producers[out]} and {stage.name}")
+            producers[out] = stage.name
+    return {s.name: {producers[i] for i in s.inputs if i in producers} for s in stages}
+
+
+def file_digest(path: str, known: Dict[str, list]) -> str:
+    """
+    sha256 of a file's content. `known` maps path -> [size, mtime_ns, digest]
+    from earlier runs, so unchanged files are not read again.
+    """
+    stat = Path(path).stat()
+    entry = known.get(path)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+        return entry[2]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    known[path] = [stat.st_size, stat.st_mtime_ns, h.hexdigest()]
+    return known[path][2]
+
+
+def module_files(module: str) -> List[str]:
+    """
+    Source files of `module` and of every project module it imports,
+    directly or through other project modules (relative imports included).
+    """
+    files, seen, todo = set(), set(), [module]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        try:
+            spec = importlib.util.find_spec(name)
+        except ModuleNotFoundError:
+            # `from .x import name` also yields "x.name", which is no module
+            continue
+        if spec is None or not str(spec.origin).endswith(".py"):
+            continue
+        files.add(spec.origin)
+
+        package = name if spec.submodule_search_locations else name.rpartition(".")[0]
+        with open(spec.origin, "rb") as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base = node.module or ""
+                if node.level:
+                    base = importlib.util.resolve_name("." * node.level + base, package)
+                names = [base] + [f"{base}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            todo.extend(n for n in names if n.split(".")[0] in PROJECT_PACKAGES)
+    return sorted(files)
+
+
+def stage_fingerprint(stage: Stage, known: Dict[str, list]) -> str:
+    """
+    Hash of the stage's code (its module and the project modules that
+    module imports), parameters and input contents.
+    """
+    h = hashlib.sha256(json.dumps([stage.module, stage.params], sort_keys=True).encode("utf-8"))
+    for path in module_files(stage.module):
+        h.update(file_digest(path, known).encode("utf-8"))
+    for path in stage.inputs:
+        h.update(path.encode("utf-8"))
+        h.update(file_digest(path, known).encode("utf-8") if Path(path).exists() else b"missing")
+    return h.hexdigest()
+
+
+def _run_stage(module: str, params: dict) -> None:
+    importlib.import_module(module).main(**params)
+
+
+def run_pipeline(
+    stages: List[Stage] = STAGES,
+    targets: Optional[Iterable[str]] = None,
+    force: Iterable[str] = (),
+    max_workers: int = 2,
+    state_path: str = "data/processed/pipeline_state.json",
+) -> Dict[str, str]:
+    """
+    Run the stages in dependency order, up to `max_workers` independent
+    stages at a time (each in its own process).
+
+    A stage is skipped when its fingerprint (code, parameters, input
+    contents) matches the last successful run and its outputs exist, so
+    editing one seed file only re-runs the stages that read it and those
+    downstream whose inputs actually changed. `targets` limits the run to
+    those stages and their dependencies; `force` re-runs stages regardless.
+    Returns {stage: "ran" | "skipped"}.
+    """
+    by_name = {s.name: s for s in stages}
+    deps = stage_dependencies(stages)
+
+    if targets is not None:
+        wanted, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in wanted:
+                wanted.add(name)
+                todo.extend(deps[name])
+    else:
+        wanted = set(by_name)
+    force = set(force)
+
+    state = {"stages": {}, "files": {}}
+    if Path(state_path).exists():
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+    def save_state():
+        Path(state_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+
+    status = {}
+    running = {}
+    fingerprints = {}
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        while len(status) < len(wanted):
+            ready = [
+                name for name in by_name
+                if name in wanted and name not in status and name not in running.values()
+                and deps[name] <= set(status)
+            ]
+            for name in ready:
+                stage = by_name[name]
+                fingerprint = stage_fingerprint(stage, state["files"])
+                if (
+                    name not in force
+                    and state["stages"].get(name) == fingerprint
+                    and all(Path(p).exists() for p in stage.outputs)
+                ):
+                    status[name] = "skipped"
+                    print(f"[pipeline] {name}: up to date")
+                    continue
+                print(f"[pipeline] {name}: running")
+                future = pool.submit(_run_stage, stage.module, stage.params)
+                running[future] = name
+                fingerprints[name] = fingerprint
+                state["stages"].pop(name, None)
+
+            if not running:
+                if len(status) < len(wanted) and not ready:
+                    raise ValueError(f"Dependency cycle among {sorted(wanted - set(status))}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                future.result()
+                # recorded only after success, so a failed stage re-runs
+                state["stages"][name] = fingerprints.pop(name)
+                status[name] = "ran"
+            save_state()
+
+    return status
+
+
+def main(targets=None, force=(), max_workers=2):
+    status = run_pipeline(STAGES, targets, force, max_workers)
+    ran = [name for name, s in status.items() if s == "ran"]
+    print(f"Pipeline finished: {len(ran)} stage(s) ran, {len(status) - len(ran)} up to date.")
+
+
+if __name__ == "__main__":
+    main()
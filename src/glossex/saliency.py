@@ -1,8 +1,9 @@
 from collections import Counter
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence
 
-from wordfreq import zipf_frequency
-import math
+import numpy as np
+
+from .general_freq import general_prob, zipf_table
 
 
 def compute_saliency(tokens: List[str]) -> Dict[str, float]:
@@ -13,21 +14,32 @@ def compute_saliency(tokens: List[str]) -> Dict[str, float]:
     Higher score => more domain-specific.
     """
     token_counts = Counter(tokens)
-    total_tokens = sum(token_counts.values())
+    return compute_saliency_from_counts(list(token_counts), list(token_counts.values()))
+
 
-    saliency_scores = {}
+def compute_saliency_from_counts(
+    vocab: Sequence[str],
+    counts: Sequence[int],
+    zipf: Optional[np.ndarray] = None,
+) -> Dict[str, float]:
+    """
+    compute_saliency over precomputed counts, e.g. the np.bincount of the
+    token-id artifact (see token_store.token_counts). Zero counts are skipped.
 
-    for token, freq in token_counts.items():
-        domain_prob = freq / total_tokens
+    `zipf` is the general_freq.zipf_table of `vocab`; pass a persisted one to
+    avoid the wordfreq lookups.
+    """
+    counts = np.asarray(counts, dtype=float)
+    if zipf is None:
+        zipf = zipf_table(vocab)
 
-        # General language frequency (Zipf scale)
-        general_freq = zipf_frequency(token, "en")
+    keep = np.flatnonzero(counts)
+    domain_prob = counts[keep] / counts.sum()
 
-        # Convert Zipf frequency to probability-like value
-        general_prob = 10 ** general_freq if general_freq > 0 else 1e-9
+    # Zipf frequency -> probability-like value
+    general = general_prob(zipf[keep])
 
-        # Saliency score (log-ratio)
-        score = math.log(domain_prob / general_prob + 1e-9)
-        saliency_scores[token] = score
+    # Saliency score (log-ratio)
+    scores = np.log(domain_prob / general + 1e-9)
 
-    return saliency_scores
+    return dict(zip([vocab[i] for i in keep.tolist()], scores.tolist()))
@@ -0,0 +1,23 @@
+from typing import List
+
+import numpy as np
+
+
+def cosine_matrix(a: np.ndarray, b: np.ndarray, dtype=np.float64) -> np.ndarray:
+    """
+    Pairwise cosine similarity between the rows of `a` and `b`.
+    Uses the same formula as the scalar cosine_similarity helpers
+    (dot / (|a| * |b| + 1e-9)), but with a single matrix multiply.
+    """
+    a = np.asarray(a, dtype=dtype)
+    b = np.asarray(b, dtype=dtype)
+    norms = np.outer(np.linalg.norm(a, axis=1), np.linalg.norm(b, axis=1))
+    return (a @ b.T) / (norms + 1e-9)
+
+
+def present_seeds(seeds: List[str], embeddings) -> List[str]:
+    """
+    Seeds that have an embedding, in order (duplicates are kept, exactly as
+    the per-seed loops counted them).
+    """
+    return [s for s in seeds if s in embeddings]
@@ -0,0 +1,346 @@
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .embedding_store import embedding_matrix, load_embedding_store
+from .filtering import load_seed_list as load_filtering_seeds
+from .hybrid_rank import norm, tfidf_score_map
+from .metrics import load_gold, prf
+from .ngram_stats import load_or_fit_ngram_tfidf
+from .rank_phrases import load_seed_list, phrase_matrix, select_phrases
+from .similarity import cosine_matrix, present_seeds
+
+
+def seed_subsets(
+    econ_seeds: List[str],
+    general_seeds: List[str],
+    fractions: Sequence[float] = (1.0, 0.75, 0.5),
+    n_draws: int = 5,
+    random_state: int = 0,
+    filtering_seeds: Optional[Tuple[List[str], List[str]]] = None,
+) -> List[dict]:
+    """
+    Seed configurations for a sweep: the full lists, plus `n_draws` random
+    subsets keeping each fraction of both lists.
+
+    `filtering_seeds` are the same seed files as read by filtering.py
+    (line for line with the phrase-ranking lists); each configuration then
+    also gets the matching entries as "filtering_econ"/"filtering_general".
+    """
+    rng = random.Random(random_state)
+
+    def config(name, econ_rows, general_rows):
+        out = {
+            "name": name,
+            "econ": [econ_seeds[i] for i in econ_rows],
+            "general": [general_seeds[i] for i in general_rows],
+        }
+        if filtering_seeds is not None:
+            out["filtering_econ"] = [filtering_seeds[0][i] for i in econ_rows]
+            out["filtering_general"] = [filtering_seeds[1][i] for i in general_rows]
+        return out
+
+    configs = [config("all", range(len(econ_seeds)), range(len(general_seeds)))]
+    for frac in fractions:
+        if frac >= 1.0:
+            continue
+        for d in range(n_draws):
+            configs.append(config(
+                f"frac{frac:g}_{d}",
+                rng.sample(range(len(econ_seeds)), max(1, round(frac * len(econ_seeds)))),
+                rng.sample(range(len(general_seeds)), max(1, round(frac * len(general_seeds)))),
+            ))
+    return configs
+
+
+def config_seeds(config: dict, stage: str = "ranking") -> Tuple[List[str], List[str]]:
+    """
+    (econ, general) seeds of a configuration for the "ranking" or
+    "filtering" stage; without separate filtering seeds both use the same.
+    """
+    if stage == "filtering" and "filtering_econ" in config:
+        return config["filtering_econ"], config["filtering_general"]
+    return config["econ"], config["general"]
+
+
+def seed_weights(
+    seed_terms: List[str], configs: List[dict], embeddings, stage: str = "ranking"
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (len(seed_terms), n_configs) weights such that
+    cosines(., seed_terms) @ weights = mean econ-seed cosine minus mean
+    general-seed cosine, for every configuration at once. Seeds without an
+    embedding are left out and duplicates counted, as present_seeds does.
+    Also returns which configurations have both econ and general seeds
+    (clusters are only scored then, see filtering.score_clusters).
+    """
+    col = {s: i for i, s in enumerate(seed_terms)}
+    weights = np.zeros((len(seed_terms), len(configs)))
+    valid = np.zeros(len(configs), dtype=bool)
+
+    for c, config in enumerate(configs):
+        econ, general = (present_seeds(seeds, embeddings) for seeds in config_seeds(config, stage))
+        for seeds, sign in [(econ, 1.0), (general, -1.0)]:
+            for s in seeds:
+                weights[col[s], c] += sign / len(seeds)
+        valid[c] = bool(econ) and bool(general)
+
+    return weights, valid
+
+
+def sweep_hybrid(
+    terms: List[str],
+    emb_scores: np.ndarray,
+    tfidf_scores: np.ndarray,
+    alphas: np.ndarray,
+    gold: set,
+    ks: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluate hybrid_rank for every (seed configuration, alpha) at once.
+    `emb_scores` holds one column of phrase scores per configuration.
+    Each column is ordered as rank_phrases orders it before the min-max
+    normalization and the hybrid sort, so ties break the same way.
+    Returns precision, recall and F1 of shape (n_configs, n_alphas, len(ks)).
+    """
+    n_terms, n_configs = emb_scores.shape
+    is_gold = np.array([t in gold for t in terms], dtype=np.int64)
+    if n_terms == 0:
+        zeros = np.zeros((n_configs, len(alphas), len(ks)))
+        return prf(zeros, ks, len(gold))
+
+    # rank_phrases: stable sort by score, descending
+    ranked = np.argsort(-emb_scores, axis=0, kind="stable")
+    emb = np.take_along_axis(emb_scores, ranked, axis=0)
+    tfidf = tfidf_scores[ranked]
+
+    def minmax(x):
+        lo, hi = x.min(axis=0), x.max(axis=0)
+        return (x - lo) / (hi - lo + 1e-9)
+
+    # (terms, configs, alphas)
+    alphas = np.asarray(alphas, dtype=float)
+    hybrid = (
+        alphas * minmax(tfidf)[:, :, None] + (1 - alphas) * minmax(emb)[:, :, None]
+    )
+    order = np.argsort(-hybrid, axis=0, kind="stable")
+    final = np.take_along_axis(np.broadcast_to(ranked[:, :, None], hybrid.shape), order, axis=0)
+
+    cum_hits = np.cumsum(is_gold[final], axis=0)
+    idx = np.maximum(np.minimum(ks, n_terms) - 1, 0)
+    correct = np.where(ks > 0, cum_hits[idx].transpose(1, 2, 0), 0)
+    return prf(correct, ks, len(gold))
+
+
+def sweep_filtering(
+    clusters: Dict[str, List[str]],
+    token_scores: np.ndarray,
+    token_rows: Dict[str, int],
+    valid: np.ndarray,
+    margins: np.ndarray,
+    top_n_clusters: int,
+    gold: set,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluate filter_clusters for every (margin, seed configuration): the
+    selected tokens as a set against the gold glossary.
+    `token_scores` holds one column of per-token scores per configuration;
+    cluster scores are their per-cluster means (one sparse matmul).
+    Returns precision, recall and F1 of shape (n_margins, n_configs).
+    """
+    rows, cols, n_members, n_gold_terms = [], [], [], []
+    for i, tokens in enumerate(clusters.values()):
+        embedded = [t for t in tokens if t in token_rows]
+        rows.extend([i] * len(embedded))
+        cols.extend(token_rows[t] for t in embedded)
+        n_members.append(len(embedded))
+        n_gold_terms.append(sum(t in gold for t in tokens))
+    n_clusters = len(clusters)
+    n_members = np.array(n_members, dtype=float)
+    sizes = np.array([len(tokens) for tokens in clusters.values()], dtype=float)
+    n_gold_terms = np.array(n_gold_terms, dtype=float)
+
+    means = sparse.csr_matrix(
+        (1.0 / np.maximum(n_members, 1)[rows], (rows, cols)),
+        shape=(n_clusters, len(token_scores)),
+    )
+    scores = means @ token_scores  # (clusters, configs)
+
+    # clusters filter_clusters can score; others are never selected
+    scorable = (n_members > 0)[:, None] & valid[None, :]
+    masked = np.where(scorable, scores, -np.inf)
+    n_scorable = scorable.sum(axis=0)
+
+    # position in filter_clusters' stable descending sort
+    order = np.argsort(-masked, axis=0, kind="stable")
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(n_clusters)[:, None], axis=0)
+
+    margins = np.asarray(margins, dtype=float)[:, None, None]
+    passed = scorable & (masked >= margins)  # (margins, clusters, configs)
+    fill = (passed.sum(axis=1, keepdims=True) < top_n_clusters) & (
+        rank < np.minimum(top_n_clusters, n_scorable)
+    )
+    selected = (passed | fill).astype(float)
+
+    n_selected = np.einsum("mcs,c->ms", selected, sizes)
+    correct = np.einsum("mcs,c->ms", selected, n_gold_terms)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(n_selected > 0, correct / n_selected, 0.0)
+        recall = np.where(len(gold) > 0, correct / len(gold), 0.0)
+        f1 = np.where(
+            precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0
+        )
+    return precision, recall, f1
+
+
+def run_sweep(
+    phrases: List[str],
+    embeddings,
+    clusters: Dict[str, List[str]],
+    tfidf_map: Dict[str, float],
+    seed_configs: List[dict],
+    gold: set,
+    alphas: Sequence[float] = tuple(np.round(np.linspace(0.0, 1.0, 11), 2)),
+    margins: Sequence[float] = (0.0, 0.01, 0.02, 0.05, 0.1),
+    ks: Sequence[int] = (50, 100, 200),
+    top_n_clusters: int = 80,
+) -> dict:
+    """
+    Score a grid of alpha, margin and seed configurations against the gold
+    glossary. The expensive parts are computed once: phrase and token
+    cosines to every seed used by any configuration, and the TF-IDF score
+    of every phrase. Each seed configuration is then a column of mask
+    weights, so all of them are scored by one matrix multiply, and alpha
+    and margin are broadcast over the resulting score columns.
+
+    Scores equal those of rank_phrases/filter_clusters up to float
+    rounding (the seed means are summed in a different order).
+    """
+    ks = np.array(sorted(set(int(k) for k in ks)), dtype=np.int64)
+    seed_terms = list(dict.fromkeys(
+        s for config in seed_configs
+        for stage in ("ranking", "filtering")
+        for s in present_seeds(sum(config_seeds(config, stage), []), embeddings)
+    ))
+    weights, _ = seed_weights(seed_terms, seed_configs, embeddings)
+    filtering_weights, valid = seed_weights(seed_terms, seed_configs, embeddings, "filtering")
+    seed_vectors = embedding_matrix(embeddings, seed_terms)
+
+    selected = select_phrases(phrases, embeddings)
+    terms = [ph for ph, _ in selected]
+    if selected and seed_terms:
+        vectors = phrase_matrix([parts for _, parts in selected], embeddings)
+        emb_scores = cosine_matrix(vectors, seed_vectors) @ weights
+    else:
+        emb_scores = np.zeros((len(selected), len(seed_configs)))
+    tfidf_scores = np.array([tfidf_map.get(norm(t), 0.0) for t in terms], dtype=float)
+
+    hybrid = sweep_hybrid(terms, emb_scores, tfidf_scores, alphas, gold, ks)
+
+    members = list(dict.fromkeys(
+        t for tokens in clusters.values() for t in tokens if t in embeddings
+    ))
+    token_rows = {t: i for i, t in enumerate(members)}
+    if members and seed_terms:
+        token_scores = (
+            cosine_matrix(embedding_matrix(embeddings, members), seed_vectors) @ filtering_weights
+        )
+    else:
+        token_scores = np.zeros((len(members), len(seed_configs)))
+    filtering = sweep_filtering(
+        clusters, token_scores, token_rows, valid, margins, top_n_clusters, gold
+    )
+
+    metrics = ("precision", "recall", "f1")
+    results = {
+        "alphas": [float(a) for a in alphas],
+        "margins": [float(m) for m in margins],
+        "ks": ks.tolist(),
+        "top_n_clusters": top_n_clusters,
+        "seed_configs": seed_configs,
+        "hybrid": {m: v.tolist() for m, v in zip(metrics, hybrid)},
+        "filtering": {m: v.tolist() for m, v in zip(metrics, filtering)},
+        "best": {},
+    }
+
+    for i, k in enumerate(ks.tolist()):
+        f1 = hybrid[2][:, :, i]
+        c, a = np.unravel_index(np.argmax(f1), f1.shape)
+        results["best"][f"hybrid_f1@{k}"] = {
+            "seeds": seed_configs[c]["name"],
+            "alpha": float(alphas[a]),
+            "f1": float(f1[c, a]),
+            "precision": float(hybrid[0][c, a, i]),
+            "recall": float(hybrid[1][c, a, i]),
+        }
+    m, c = np.unravel_index(np.argmax(filtering[2]), filtering[2].shape)
+    results["best"]["filtering_f1"] = {
+        "seeds": seed_configs[c]["name"],
+        "margin": float(margins[m]),
+        "f1": float(filtering[2][m, c]),
+        "precision": float(filtering[0][m, c]),
+        "recall": float(filtering[1][m, c]),
+    }
+    return results
+
+
+def main(
+    alphas=tuple(np.round(np.linspace(0.0, 1.0, 11), 2)),
+    margins=(0.0, 0.01, 0.02, 0.05, 0.1),
+    fractions=(1.0, 0.75, 0.5),
+    n_draws=5,
+    embeddings_path="data/processed/lemma_embeddings",
+    out_path="results/sweep.json",
+):
+    embeddings = load_embedding_store(embeddings_path)
+    with open("data/processed/phrase_candidates.json", "r", encoding="utf-8") as f:
+        phrases = json.load(f)
+    with open("data/processed/clusters.json", "r", encoding="utf-8") as f:
+        clusters = json.load(f)
+
+    # each stage reads the seed files with its own loader (filtering.py
+    # keeps the case, rank_phrases.py lowercases)
+    econ_seeds = load_seed_list("data/seeds/economics.txt")
+    general_seeds = load_seed_list("data/seeds/general.txt")
+    filtering_seeds = (
+        load_filtering_seeds("data/seeds/economics.txt"),
+        load_filtering_seeds("data/seeds/general.txt"),
+    )
+    configs = seed_subsets(
+        econ_seeds, general_seeds, fractions, n_draws, filtering_seeds=filtering_seeds
+    )
+
+    # the same fitted n-gram scores hybrid_rank.py uses
+    terms, scores = load_or_fit_ngram_tfidf("data/raw/economics_sample.txt")
+    gold = load_gold("data/gold_glossary.csv")
+
+    results = run_sweep(
+        phrases,
+        embeddings,
+        clusters,
+        tfidf_score_map(terms, scores),
+        configs,
+        gold,
+        alphas=alphas,
+        margins=margins,
+    )
+
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    n_settings = len(configs) * (len(alphas) + len(margins))
+    print(f"Swept {n_settings} settings ({len(configs)} seed configurations)")
+    for name, best in results["best"].items():
+        params = ", ".join(f"{k}={v}" for k, v in best.items() if k in ("seeds", "alpha", "margin"))
+        print(f"{name}: {best['f1']:.3f} ({params})")
+    print("Saved:", out_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import json
+from array import array
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+
+def _store_paths(path_prefix: str):
+    return Path(f"{path_prefix}.npy"), Path(f"{path_prefix}.vocab.json")
+
+
+def token_ids(shards: Iterable[List[str]]) -> Tuple[np.ndarray, List[str]]:
+    """
+    (uint32 token ids in corpus order, vocab in order of first occurrence)
+    for the token lists yielded by preprocess_corpus.
+    """
+    index = {}
+    ids = array("I")
+    for tokens in shards:
+        ids.extend(index.setdefault(t, len(index)) for t in tokens)
+    return (np.frombuffer(ids, dtype=np.uint32) if ids else np.zeros(0, np.uint32)), list(index)
+
+
+def save_token_ids(
+    shards: Iterable[List[str]], path_prefix: str = "data/processed/processed_tokens"
+) -> int:
+    """
+    Write a token stream as `<prefix>.npy` (uint32 token ids, in corpus order)
+    plus `<prefix>.vocab.json` (id -> token, in order of first occurrence).
+    Accepts the token lists yielded by preprocess_corpus.
+    Returns the number of tokens written.
+    """
+    ids, vocab = token_ids(shards)
+    write_token_ids(ids, vocab, path_prefix)
+    return len(ids)
+
+
+def write_token_ids(
+    ids: np.ndarray, vocab: List[str], path_prefix: str = "data/processed/processed_tokens"
+) -> None:
+    npy_path, vocab_path = _store_paths(path_prefix)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(npy_path, ids)
+    with open(vocab_path, "w", encoding="utf-8") as f:
+        json.dump(vocab, f)
+
+
+def load_token_ids(
+    path_prefix: str = "data/processed/processed_tokens", mmap: bool = True
+) -> Tuple[np.ndarray, List[str]]:
+    """
+    Load (ids, vocab) written by save_token_ids, memory-mapping the ids.
+    A legacy `<prefix>.json` token list is converted on first use.
+    """
+    npy_path, vocab_path = _store_paths(path_prefix)
+    legacy_path = Path(f"{path_prefix}.json")
+
+    if not npy_path.exists() and legacy_path.exists():
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            save_token_ids([json.load(f)], path_prefix)
+
+    with open(vocab_path, "r", encoding="utf-8") as f:
+        vocab = json.load(f)
+    ids = np.load(npy_path, mmap_mode="r" if mmap else None)
+
+    return ids, vocab
+
+
+def append_token_ids(
+    tokens: List[str], path_prefix: str = "data/processed/processed_tokens"
+) -> int:
+    """
+    Append tokens to an artifact written by save_token_ids, extending the
+    vocabulary with unseen tokens. Existing ids keep their meaning, so the
+    result equals save_token_ids over the concatenated stream.
+    Returns the total number of tokens.
+    """
+    ids, vocab = load_token_ids(path_prefix, mmap=False)
+    index = {t: i for i, t in enumerate(vocab)}
+    new_ids = np.fromiter(
+        (index.setdefault(t, len(index)) for t in tokens), dtype=np.uint32, count=len(tokens)
+    )
+
+    npy_path, vocab_path = _store_paths(path_prefix)
+    np.save(npy_path, np.concatenate([ids, new_ids]))
+    with open(vocab_path, "w", encoding="utf-8") as f:
+        json.dump(list(index), f)
+
+    return len(ids) + len(new_ids)
+
+
+def token_counts(ids: np.ndarray, vocab: List[str]) -> np.ndarray:
+    """
+    Corpus frequency of every vocabulary entry (aligned with `vocab`).
+    """
+    return np.bincount(ids, minlength=len(vocab))
@@ -0,0 +1,44 @@
+import re
+from typing import Iterable, List, Tuple
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# the token_pattern TfidfVectorizer uses in phrases.py / hybrid_rank.py
+TOKEN_PATTERN = r"(?u)\b[a-zA-Z][a-zA-Z\-]+\b"
+TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+
+def regex_tokenize(text: str) -> List[str]:
+    """
+    Lowercase and tokenize exactly like TfidfVectorizer(lowercase=True,
+    token_pattern=TOKEN_PATTERN) does before building n-grams.
+    """
+    return TOKEN_RE.findall(text.lower())
+
+
+def tokenize_docs(docs: Iterable[str]) -> List[List[str]]:
+    """
+    Token stream per pseudo-doc, computed once and shared by the unigram
+    preprocessing and the n-gram TF-IDF stages.
+    """
+    return [regex_tokenize(d) for d in docs]
+
+
+def word_ngrams(
+    tokens: List[str],
+    ngram_range: Tuple[int, int] = (2, 3),
+    stop_words=ENGLISH_STOP_WORDS,
+) -> List[str]:
+    """
+    Stop-word filtering plus n-gram generation, in the same order as
+    sklearn's word analyzer, so pre-tokenized docs give the same features.
+    """
+    if stop_words is not None:
+        tokens = [w for w in tokens if w not in stop_words]
+
+    min_n, max_n = ngram_range
+    ngrams = list(tokens) if min_n == 1 else []
+    for n in range(max(min_n, 2), min(max_n + 1, len(tokens) + 1)):
+        for i in range(len(tokens) - n + 1):
+            ngrams.append(" ".join(tokens[i:i + n]))
+    return ngrams